@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+End-to-end timings of every script on synthetic inputs, written to a JSON results file.
+
+Each script runs as a subprocess in a scratch copy of the site, at every --sizes value:
+
+  publications.py / talks.py   publications.tsv / talks.tsv with N rows
+  pubsFromBib.py               pubs.bib with N entries (+ proceedings.bib with N/10)
+  talkmap.py                   N _talks/ files, geocoded with --offline
+  update_publications_orcid.py one ORCID profile with N works, against benchmarks/standin.py
+
+"cold" wipes outputs and caches before every run; "warm" reruns on the result of a cold
+run, so it measures the manifest / bibcache / front-matter / Crossref caches. The median of
+--repeat runs is reported. Compare two results files with --compare:
+
+  python benchmarks/bench_e2e.py --out before.json
+  python benchmarks/bench_e2e.py --out after.json --compare before.json
+  python benchmarks/bench_e2e.py --sizes 100 --latency 0.05 --throttle 0.05 --only update_publications_orcid
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import synthetic
+from standin import ORCID_ID, StandIn
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def run(cmd, cwd, env=None) -> float:
+    t0 = time.perf_counter()
+    subprocess.run(cmd, cwd=cwd, env={**os.environ, **(env or {})}, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - t0
+
+
+def wipe(*paths: Path) -> None:
+    for p in paths:
+        if p.is_dir():
+            shutil.rmtree(p)
+        elif p.exists():
+            p.unlink()
+
+
+class Site:
+    """Scratch copy of the scripts with empty collection folders."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        for d in ("markdown_generator", "scripts"):
+            shutil.copytree(ROOT / d, root / d, ignore=shutil.ignore_patterns(
+                "__pycache__", ".manifest.json", ".bibcache.json", "*.tsv", "*.bib"))
+        shutil.copy(ROOT / "talkmap.py", root / "talkmap.py")
+        for d in ("_publications", "_talks", "_data"):
+            (root / d).mkdir()
+        self.gen = root / "markdown_generator"
+
+    def reset(self, *names: str) -> None:
+        wipe(*(self.root / n for n in names))
+        for n in names:
+            if not Path(n).suffix:
+                (self.root / n).mkdir()
+
+
+# each case: prepare(site, n, args) -> (cmd, cwd, env, [paths to wipe for a cold run]), or a skip reason
+
+def case_publications(site, n, args):
+    (site.gen / "publications.tsv").write_text(synthetic.publications_tsv(n), encoding="utf-8")
+    return [sys.executable, "publications.py"], site.gen, {}, ["_publications", "markdown_generator/.manifest.json"]
+
+
+def case_talks(site, n, args):
+    (site.gen / "talks.tsv").write_text(synthetic.talks_tsv(n), encoding="utf-8")
+    return [sys.executable, "talks.py"], site.gen, {}, ["_talks", "markdown_generator/.manifest.json"]
+
+
+def case_pubsFromBib(site, n, args):
+    if not importlib.util.find_spec("pybtex"):
+        return "pybtex not installed"
+    (site.gen / "pubs.bib").write_text(synthetic.bib_text(n), encoding="utf-8")
+    (site.gen / "proceedings.bib").write_text(synthetic.bib_text(max(1, n // 10), "booktitle", seed=1),
+                                              encoding="utf-8")
+    return ([sys.executable, "pubsFromBib.py"], site.gen, {},
+            ["_publications", "markdown_generator/.manifest.json", "markdown_generator/.bibcache.json"])
+
+
+def case_talkmap(site, n, args):
+    site.reset("_talks")
+    for name, text in synthetic.talk_markdown(n).items():
+        (site.root / "_talks" / name).write_text(text, encoding="utf-8")
+    table = site.root / "geocode-table.json"
+    table.write_text(json.dumps({p: [i, -i] for i, p in enumerate(synthetic.PLACES)}), encoding="utf-8")
+    return ([sys.executable, "../talkmap.py", "--offline", str(table)], site.root / "_talks", {},
+            ["_data/.cache", "talkmap"])
+
+
+def case_update_publications_orcid(site, n, args):
+    if not importlib.util.find_spec("requests"):
+        return "requests not installed"
+    works, messages = synthetic.orcid_works(n)
+    args.standin.profiles = {ORCID_ID: works}
+    args.standin.messages = messages
+    env = {"ORCID": ORCID_ID, "YEARS": "100", "CROSSREF_RPS": str(args.crossref_rps), **args.standin.env}
+    return ([sys.executable, "scripts/update_publications_orcid.py"], site.root, env,
+            ["_data/.cache", "_data/pubs_orcid.json"])
+
+
+CASES = {
+    "publications": case_publications,
+    "talks": case_talks,
+    "pubsFromBib": case_pubsFromBib,
+    "talkmap": case_talkmap,
+    "update_publications_orcid": case_update_publications_orcid,
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results, previous_path: Path) -> None:
+    prev = {(r["script"], r["size"], r["phase"]): r for r in json.loads(previous_path.read_text())["results"]}
+    print(f"\n{'vs ' + previous_path.name:<40} {'before s':>9} {'after s':>9} {'change':>8}")
+    for r in results:
+        old = prev.get((r["script"], r["size"], r["phase"]))
+        if old and "seconds" in old and "seconds" in r:
+            change = (r["seconds"] - old["seconds"]) / old["seconds"] * 100 if old["seconds"] else 0.0
+            label = f"{r['script']} {r['size']} {r['phase']}"
+            print(f"{label:<40} {old['seconds']:>9.3f} {r['seconds']:>9.3f} {change:>+7.1f}%")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--only", nargs="+", choices=list(CASES), help="run only these scripts")
+    ap.add_argument("--latency", type=float, default=0.0, help="stand-in server delay per response, seconds")
+    ap.add_argument("--throttle", type=float, default=0.0, help="fraction of stand-in responses that are 429")
+    ap.add_argument("--crossref-rps", type=float, default=0, help="CROSSREF_RPS for the updater (0 = unlimited)")
+    ap.add_argument("--out", type=Path, default=Path("bench-e2e.json"))
+    ap.add_argument("--compare", type=Path, help="earlier results file to compare against")
+    args = ap.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, StandIn({}, {}, args.latency, args.throttle) as args.standin:
+        site = Site(Path(tmp))
+        print(f"{'script':<27} {'size':>6} {'phase':<5} {'median s':>9}")
+        for name in args.only or CASES:
+            for n in args.sizes:
+                prepared = CASES[name](site, n, args)
+                if isinstance(prepared, str):
+                    print(f"{name:<27} {n:>6} skipped: {prepared}")
+                    results.append({"script": name, "size": n, "phase": "cold", "skipped": prepared})
+                    continue
+                cmd, cwd, env, state = prepared
+                for phase in ("cold", "warm"):
+                    args.standin.stats.clear()
+                    runs = []
+                    r = {"script": name, "size": n, "phase": phase}
+                    try:
+                        for _ in range(args.repeat):
+                            if phase == "cold":
+                                site.reset(*state)
+                            runs.append(run(cmd, cwd, env))
+                    except subprocess.CalledProcessError as e:
+                        # e.g. the updater giving up on a throttled stand-in; recorded, not fatal
+                        r["failed"] = f"exit status {e.returncode}"
+                    else:
+                        r.update(seconds=statistics.median(runs), runs=runs)
+                    if name == "update_publications_orcid":
+                        r["requests"] = dict(args.standin.stats)
+                    results.append(r)
+                    status = f"{r['seconds']:>9.3f}" if "seconds" in r else r["failed"]
+                    print(f"{name:<27} {n:>6} {phase:<5} {status}")
+
+    meta = {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "latency": args.latency,
+        "throttle": args.throttle,
+        "crossref_rps": args.crossref_rps,
+    }
+    args.out.write_text(json.dumps({"meta": meta, "results": results}, indent=1), encoding="utf-8")
+    print(f"results written to {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Per-entry render cost of the markdown generators: the old `md +=` / per-character
+html_escape code vs. the shared markdown_generator/render.py.
+
+The "before" functions below are the loop bodies of publications.py, talks.py and
+pubsFromBib.py as they were before render.py, kept verbatim apart from being wrapped in
+functions. Both versions render the same synthetic entries (10k by default), their output
+is checked to be identical, and the best of --repeat runs is reported in µs per entry.
+
+  python benchmarks/bench_render.py
+  python benchmarks/bench_render.py --entries 50000 --repeat 3
+"""
+import argparse
+import html
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from time import strptime
+
+import synthetic
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "markdown_generator"))
+import render  # noqa: E402
+from bibcache import entry_objects  # noqa: E402
+from tsv import stream_tsv  # noqa: E402
+
+# ---------- before: the generators' original per-entry code ----------
+
+html_escape_table = {
+    "&": "&amp;",
+    '"': "&quot;",
+    "'": "&apos;"
+    }
+
+
+def html_escape(text):
+    """Produce entities within text."""
+    return "".join(html_escape_table.get(c,c) for c in text)
+
+
+def talks_html_escape(text):
+    if type(text) is str:
+        return "".join(html_escape_table.get(c,c) for c in text)
+    else:
+        return "False"
+
+
+def old_publication(item):
+    md_filename = str(item.pub_date) + "-" + item.url_slug + ".md"
+    html_filename = str(item.pub_date) + "-" + item.url_slug
+    md = "---\ntitle: \""   + item.title + '"\n'
+    md += """collection: publications"""
+    md += """\npermalink: /publication/""" + html_filename
+    if len(str(item.excerpt)) > 5:
+        md += "\nexcerpt: '" + html_escape(item.excerpt) + "'"
+    md += "\ndate: " + str(item.pub_date)
+    md += "\nvenue: '" + html_escape(item.venue) + "'"
+    if len(str(item.paper_url)) > 5:
+        md += "\npaperurl: '" + item.paper_url + "'"
+    md += "\ncitation: '" + html_escape(item.citation) + "'"
+    md += "\n---"
+    if len(str(item.paper_url)) > 5:
+        md += "\n\n<a href='" + item.paper_url + "'>Download paper here</a>\n"
+    if len(str(item.excerpt)) > 5:
+        md += "\n" + html_escape(item.excerpt) + "\n"
+    md += "\nRecommended citation: " + item.citation
+    return os.path.basename(md_filename), md
+
+
+def old_talk(item):
+    md_filename = str(item.date) + "-" + item.url_slug + ".md"
+    html_filename = str(item.date) + "-" + item.url_slug
+    md = "---\ntitle: \""   + item.title + '"\n'
+    md += "collection: talks" + "\n"
+    if len(str(item.type)) > 3:
+        md += 'type: "' + item.type + '"\n'
+    else:
+        md += 'type: "Talk"\n'
+    md += "permalink: /talks/" + html_filename + "\n"
+    if len(str(item.venue)) > 3:
+        md += 'venue: "' + item.venue + '"\n'
+    if len(str(item.location)) > 3:
+        md += "date: " + str(item.date) + "\n"
+    if len(str(item.location)) > 3:
+        md += 'location: "' + str(item.location) + '"\n'
+    md += "---\n"
+    if len(str(item.talk_url)) > 3:
+        md += "\n[More information here](" + item.talk_url + ")\n"
+    if len(str(item.description)) > 3:
+        md += "\n" + talks_html_escape(item.description) + "\n"
+    return os.path.basename(md_filename), md
+
+
+def old_bib_entry(settings, bib_id, b, persons):
+    pub_year = "1900"
+    pub_month = "01"
+    pub_day = "01"
+    try:
+        pub_year = f'{b["year"]}'
+        if "month" in b.keys():
+            if(len(b["month"])<3):
+                pub_month = "0"+b["month"]
+                pub_month = pub_month[-2:]
+            elif(b["month"] not in range(12)):
+                tmnth = strptime(b["month"][:3],'%b').tm_mon
+                pub_month = "{:02d}".format(tmnth)
+            else:
+                pub_month = str(b["month"])
+        if "day" in b.keys():
+            pub_day = str(b["day"])
+        pub_date = pub_year+"-"+pub_month+"-"+pub_day
+        clean_title = b["title"].replace("{", "").replace("}","").replace("\\","").replace(" ","-")
+        url_slug = re.sub("\\[.*\\]|[^a-zA-Z0-9_-]", "", clean_title)
+        url_slug = url_slug.replace("--","-")
+        md_filename = (str(pub_date) + "-" + url_slug + ".md").replace("--","-")
+        html_filename = (str(pub_date) + "-" + url_slug).replace("--","-")
+        citation = ""
+        for author in persons["author"]:
+            citation = citation+" "+author.first_names[0]+" "+author.last_names[0]+", "
+        citation = citation + "\"" + html_escape(b["title"].replace("{", "").replace("}","").replace("\\","")) + ".\""
+        venue = settings["venue-pretext"]+b[settings["venuekey"]].replace("{", "").replace("}","").replace("\\","")
+        citation = citation + " " + html_escape(venue)
+        citation = citation + ", " + pub_year + "."
+        md = "---\ntitle: \""   + html_escape(b["title"].replace("{", "").replace("}","").replace("\\","")) + '"\n'
+        md += """collection: """ +  settings["collection"]["name"]
+        md += """\npermalink: """ + settings["collection"]["permalink"]  + html_filename
+        note = False
+        if "note" in b.keys():
+            if len(str(b["note"])) > 5:
+                md += "\nexcerpt: '" + html_escape(b["note"]) + "'"
+                note = True
+        md += "\ndate: " + str(pub_date)
+        md += "\nvenue: '" + html_escape(venue) + "'"
+        url = False
+        if "url" in b.keys():
+            if len(str(b["url"])) > 5:
+                md += "\npaperurl: '" + b["url"] + "'"
+                url = True
+        md += "\ncitation: '" + html_escape(citation) + "'"
+        md += "\n---"
+        if note:
+            md += "\n" + html_escape(b["note"]) + "\n"
+        if url:
+            md += "\n[Access paper here](" + b["url"] + "){:target=\"_blank\"}\n"
+        else:
+            md += "\nUse [Google Scholar](https://scholar.google.com/scholar?q="+html.escape(clean_title.replace("-","+"))+"){:target=\"_blank\"} for full citation"
+        return os.path.basename(md_filename), md
+    except KeyError:
+        return None, None
+
+
+# ---------- harness ----------
+
+SETTINGS = {"venuekey": "journal", "venue-pretext": "", "file": "pubs.bib",
+            "collection": {"name": "publications", "permalink": "/publication/"}}
+
+
+def rows(text):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "rows.tsv"
+        path.write_text(text, encoding="utf-8")
+        return list(stream_tsv(path))
+
+
+def best_of(fn, items, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = [fn(*it) for it in items]
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--entries", type=int, default=10000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    n = args.entries
+
+    bib = [(SETTINGS, bib_id, *entry_objects(f, p)) for bib_id, f, p in synthetic.bib_entries(n)]
+    cases = [
+        ("publications", old_publication, render.render_publication,
+         [(r,) for r in rows(synthetic.publications_tsv(n))]),
+        ("talks", old_talk, render.render_talk, [(r,) for r in rows(synthetic.talks_tsv(n))]),
+        ("pubsFromBib", old_bib_entry, lambda *a: render.render_entry(*a)[:2], bib),
+    ]
+    print(f"{'generator':<13} {'entries':>8} {'before µs':>10} {'after µs':>9} {'speedup':>8}")
+    for name, old, new, items in cases:
+        t_old, out_old = best_of(old, items, args.repeat)
+        t_new, out_new = best_of(new, items, args.repeat)
+        assert out_old == out_new, f"{name}: render.py output differs from the original code"
+        print(f"{name:<13} {n:>8} {t_old / n * 1e6:>10.2f} {t_new / n * 1e6:>9.2f} {t_old / t_new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
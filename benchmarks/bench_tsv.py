@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Startup and throughput of publications.py / talks.py: streaming csv path vs. --pandas.
+
+Each generator is run as a subprocess (so interpreter start and imports are counted) on
+synthetic TSVs in a scratch copy of the site layout. "startup" is a header-only TSV; the
+other sizes report wall time and rows/s. The manifest and output folders are wiped before
+every run so every row is rendered and written.
+
+  python benchmarks/bench_tsv.py                 # 0, 1000, 10000, 100000 rows
+  python benchmarks/bench_tsv.py --sizes 0 5000 --repeat 5
+"""
+import argparse
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import synthetic
+
+ROOT = Path(__file__).resolve().parent.parent
+GENERATORS = {
+    "publications": ("publications.tsv", "_publications", synthetic.publications_tsv),
+    "talks": ("talks.tsv", "_talks", synthetic.talks_tsv),
+}
+
+
+def run_once(work: Path, script: str, out_dir: str, use_pandas: bool) -> float:
+    shutil.rmtree(work / out_dir, ignore_errors=True)
+    (work / out_dir).mkdir()
+    (work / "markdown_generator" / ".manifest.json").unlink(missing_ok=True)
+    cmd = [sys.executable, f"{script}.py"] + (["--pandas"] if use_pandas else [])
+    t0 = time.perf_counter()
+    subprocess.run(cmd, cwd=work / "markdown_generator", check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[0, 1000, 10000, 100000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        shutil.copytree(ROOT / "markdown_generator", work / "markdown_generator")
+        shutil.copytree(ROOT / "scripts", work / "scripts")
+        print(f"{'generator':<13} {'rows':>7} {'csv s':>8} {'pandas s':>9} {'csv rows/s':>11} {'pandas rows/s':>14}")
+        for script, (tsv, out_dir, make) in GENERATORS.items():
+            for n in args.sizes:
+                (work / "markdown_generator" / tsv).write_text(make(n), encoding="utf-8")
+                t_csv = statistics.median(run_once(work, script, out_dir, False) for _ in range(args.repeat))
+                t_pd = statistics.median(run_once(work, script, out_dir, True) for _ in range(args.repeat))
+                rate = (lambda t: f"{n / t:,.0f}" if n else "startup")
+                print(f"{script:<13} {n:>7} {t_csv:>8.3f} {t_pd:>9.3f} {rate(t_csv):>11} {rate(t_pd):>14}")
+
+
+if __name__ == "__main__":
+    main()
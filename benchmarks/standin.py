@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Local stand-in for the ORCID and Crossref endpoints update_publications_orcid.py uses.
+
+  GET /orcid/v3.0/{orcid}/works              ORCID works summary
+  GET /orcid/v3.0/{orcid}/works/{pc,pc,...}  ORCID bulk work details (at most 100 put-codes)
+  GET /crossref/works/{doi}                  one Crossref message (ETag / If-None-Match -> 304)
+  GET /crossref/works?filter=doi:a,doi:b     Crossref batch lookup
+  GET /openalex/works?filter=...&cursor=*    OpenAlex works, cursor-paged (per-page at most 200)
+
+Point the updater at it with ORCID_API=<url>/orcid/v3.0, CROSSREF_API=<url>/crossref and
+OPENALEX_API=<url>/openalex (the `env` attribute).
+Every response can be delayed by `latency` seconds, and a `throttle` fraction of requests
+(chosen by a seeded RNG, so runs are repeatable) is answered with 429 + Retry-After.
+With `advertise`, Crossref responses carry X-Rate-Limit-Limit / X-Rate-Limit-Interval.
+
+  python benchmarks/standin.py --works 2000 --latency 0.05 --throttle 0.02
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import synthetic
+
+
+class StandIn:
+    """Serves `profiles` ({orcid: works response}), `messages` ({lowercase doi: message}) and
+    `openalex` ({orcid: [OpenAlex work]}) on 127.0.0.1 from a background thread; use as a
+    context manager."""
+
+    def __init__(self, profiles, messages, latency=0.0, throttle=0.0, retry_after=1, seed=0, port=0,
+                 advertise=None, openalex=None):
+        self.profiles = profiles
+        self.messages = messages
+        self.openalex = openalex or {}
+        self.latency = latency
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.advertise = advertise
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                standin._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.env = {"ORCID_API": f"{self.url}/orcid/v3.0", "CROSSREF_API": f"{self.url}/crossref",
+                    "OPENALEX_API": f"{self.url}/openalex"}
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handle(self, req):
+        parts = urlsplit(req.path)
+        path = unquote(parts.path)
+        with self._lock:
+            throttled = self._rng.random() < self.throttle
+        if self.latency:
+            time.sleep(self.latency)
+
+        if path.startswith("/orcid/"):
+            endpoint = "orcid"
+        elif path == "/crossref/works":
+            endpoint = "crossref-batch"
+        elif path.startswith("/crossref/works/"):
+            endpoint = "crossref-doi"
+        elif path == "/openalex/works":
+            endpoint = "openalex"
+        else:
+            endpoint = "unknown"
+        with self._lock:
+            self.stats[endpoint] += 1
+            if throttled:
+                self.stats["429"] += 1
+        if throttled:
+            return self._send(req, 429, {"message": "rate limited"}, {"Retry-After": str(self.retry_after)})
+
+        if endpoint == "orcid":
+            segments = path.split("/")   # ["", "orcid", "v3.0", orcid, "works", put-codes]
+            works = self.profiles.get(segments[3])
+            if works is None:
+                return self._send(req, 404, {})
+            if len(segments) < 6:
+                return self._send(req, 200, works)
+            putcodes = segments[5].split(",")
+            if len(putcodes) > 100:
+                return self._send(req, 400, {"user-message": "too many put-codes"})
+            with self._lock:
+                self.stats["orcid-bulk"] += 1
+            by_pc = {str(w["put-code"]): w for g in works["group"] for w in g["work-summary"]}
+            bulk = [{"work": synthetic.orcid_work_detail(by_pc[pc])} if pc in by_pc else
+                    {"error": {"response-code": 404, "user-message": f"put-code {pc} not found"}}
+                    for pc in putcodes]
+            return self._send(req, 200, {"bulk": bulk})
+        if endpoint == "openalex":
+            return self._openalex(req, parse_qs(parts.query))
+        rate = {}
+        if self.advertise:
+            rate = {"X-Rate-Limit-Limit": str(self.advertise), "X-Rate-Limit-Interval": "1s"}
+        if endpoint == "crossref-batch":
+            filt = (parse_qs(parts.query).get("filter") or [""])[0]
+            dois = [f[4:].lower() for f in filt.split(",") if f.startswith("doi:")]
+            items = [self.messages[d] for d in dois if d in self.messages]
+            return self._send(req, 200, {"status": "ok", "message": {"items": items, "total-results": len(items)}},
+                              rate)
+        if endpoint == "crossref-doi":
+            m = self.messages.get(path[len("/crossref/works/"):].lower())
+            if m is None:
+                return self._send(req, 404, {}, rate)
+            body = {"status": "ok", "message": m}
+            etag = '"' + hashlib.sha1(json.dumps(m, sort_keys=True).encode()).hexdigest()[:16] + '"'
+            if req.headers.get("If-None-Match") == etag:
+                with self._lock:
+                    self.stats["304"] += 1
+                return self._send(req, 304, None, {"ETag": etag, **rate})
+            return self._send(req, 200, body, {"ETag": etag, **rate})
+        return self._send(req, 404, {})
+
+    def _openalex(self, req, query):
+        filters = dict(f.split(":", 1) for f in (query.get("filter") or [""])[0].split(",") if ":" in f)
+        since = filters.get("from_publication_date", "")
+        per_page = int((query.get("per-page") or ["25"])[0])
+        if per_page > 200:
+            return self._send(req, 400, {"error": "per-page is at most 200"})
+        works, ids = [], set()
+        for orcid in filters.get("author.orcid", "").split("|"):
+            for w in self.openalex.get(orcid) or []:
+                if w["publication_date"] >= since and w["id"] not in ids:
+                    ids.add(w["id"])
+                    works.append(w)
+        cursor = (query.get("cursor") or ["*"])[0]
+        start = 0 if cursor == "*" else int(cursor)
+        page = works[start:start + per_page]
+        more = start + per_page < len(works)
+        meta = {"count": len(works), "per_page": per_page, "next_cursor": str(start + per_page) if more else None}
+        return self._send(req, 200, {"meta": meta, "results": page})
+
+    def _send(self, req, status, body, headers=None):
+        data = b"" if body is None else json.dumps(body).encode("utf-8")
+        with self._lock:
+            self.stats["bytes"] += len(data)
+        req.send_response(status)
+        req.send_header("Content-Type", "application/json")
+        req.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            req.send_header(k, v)
+        req.end_headers()
+        if data:
+            req.wfile.write(data)
+
+
+ORCID_ID = "0000-0000-0000-0000"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--works", type=int, default=500, help=f"synthetic works for ORCID {ORCID_ID}")
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    ap.add_argument("--throttle", type=float, default=0.0, help="fraction of requests answered with 429")
+    ap.add_argument("--advertise", type=int, help="X-Rate-Limit-Limit per 1s sent with Crossref responses")
+    ap.add_argument("--port", type=int, default=8000)
+    args = ap.parse_args()
+
+    works, messages = synthetic.orcid_works(args.works)
+    with StandIn({ORCID_ID: works}, messages, args.latency, args.throttle, port=args.port,
+                 advertise=args.advertise,
+                 openalex={ORCID_ID: synthetic.openalex_works(works, messages)}) as standin:
+        print(f"ORCID={ORCID_ID} " + " ".join(f"{k}={v}" for k, v in standin.env.items()))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print(dict(standin.stats))
+
+
+if __name__ == "__main__":
+    main()
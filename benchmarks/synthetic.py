@@ -0,0 +1,202 @@
+# coding: utf-8
+"""
+Synthetic inputs for the benchmarks, shaped like the sample data that ships with the repo.
+
+Every generator is deterministic for a given size and seed, so timings from different
+runs (or different branches) are measured on identical input.
+"""
+import random
+
+PUB_COLUMNS = ["pub_date", "title", "venue", "excerpt", "citation", "url_slug", "paper_url", "slides_url"]
+TALK_COLUMNS = ["title", "type", "url_slug", "venue", "date", "location", "talk_url", "description"]
+
+WORDS = ("flood river model global hydrology levee urban rainfall runoff basin risk warning "
+         "simulation resolution climate deep learning analysis uncertainty catchment storm").split()
+PLACES = ["Tokyo, Japan", "Berkeley CA, USA", "London, UK", "Los Angeles, CA", "Wuhan, China",
+          "Bristol, UK", "Vienna, Austria", "San Francisco, California", "Kyoto, Japan", "Paris, France"]
+
+
+def _phrase(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _date(rng):
+    return f"{rng.randint(2000, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+
+def publications_tsv(n, seed=0):
+    """publications.tsv text with n rows; about a third have a blank excerpt or paper_url."""
+    rng = random.Random(seed)
+    lines = ["\t".join(PUB_COLUMNS)]
+    for i in range(n):
+        title = _phrase(rng, 6).title() + f" {i}"
+        venue = "Journal of " + _phrase(rng, 2).title()
+        excerpt = "" if i % 3 == 0 else f"This paper is about {_phrase(rng, 12)} & 'more'."
+        citation = f'Your Name, You. ({_date(rng)[:4]}). "{title}." <i>{venue}</i>. 1({i}).'
+        paper_url = "" if i % 4 == 0 else f"http://academicpages.github.io/files/paper{i}.pdf"
+        lines.append("\t".join([_date(rng), title, venue, excerpt, citation, f"paper-{i}", paper_url,
+                                f"http://academicpages.github.io/files/slides{i}.pdf"]))
+    return "\n".join(lines) + "\n"
+
+
+def talks_tsv(n, seed=0):
+    """talks.tsv text with n rows; some types, urls and descriptions are blank."""
+    rng = random.Random(seed)
+    lines = ["\t".join(TALK_COLUMNS)]
+    for i in range(n):
+        lines.append("\t".join([
+            _phrase(rng, 5).title() + f" {i}",
+            rng.choice(["Talk", "Tutorial", "Conference proceedings talk", ""]),
+            f"talk-{i}",
+            "University of " + _phrase(rng, 1).title(),
+            _date(rng),
+            rng.choice(PLACES),
+            "" if i % 2 else f"http://example{i}.com",
+            "" if i % 5 == 0 else f"This is a description of {_phrase(rng, 15)}.",
+        ]))
+    return "\n".join(lines) + "\n"
+
+
+MONTHS = ["jan", "feb", "March", "4", "11", "dec", ""]
+
+
+def bib_entries(n, venuekey="journal", seed=0):
+    """n parsed bib entries in bibcache's plain form: (bib_id, [[field, value], ...], {role: [[first, last], ...]}).
+
+    Every 7th entry lacks the venue field (the generator's "Missing Expected Field" path)."""
+    rng = random.Random(seed)
+    entries = []
+    for i in range(n):
+        fields = [["title", "{" + _phrase(rng, 3).title() + "} " + _phrase(rng, 5) + f" {i}"],
+                  ["year", str(rng.randint(2000, 2025))]]
+        if i % 7:
+            fields.append([venuekey, "Journal of {" + _phrase(rng, 2).title() + "}"])
+        month = rng.choice(MONTHS)
+        if month:
+            fields.append(["month", month])
+        if i % 5 == 0:
+            fields.append(["url", f"https://example.org/paper/{i}"])
+        if i % 3 == 0:
+            fields.append(["note", f"A note on {_phrase(rng, 8)} & 'quotes'"])
+        persons = {"author": [[[rng.choice(["Jane", "Gang", "Dai", "Paul"])],
+                               [rng.choice(["Doe", "Zhao", "Yamazaki", "Bates"])]] for _ in range(rng.randint(1, 6))]}
+        entries.append((f"entry{i}", fields, persons))
+    return entries
+
+
+def bib_text(n, venuekey="journal", seed=0):
+    """A .bib file with the n entries of bib_entries(), as pybtex would read them back."""
+    lines = []
+    for bib_id, fields, persons in bib_entries(n, venuekey, seed):
+        lines.append(f"@article{{{bib_id},")
+        authors = " and ".join(" ".join(first + last) for first, last in persons["author"])
+        lines.append(f"  author = {{{authors}}},")
+        lines.extend(f"  {key} = {{{value}}}," for key, value in fields)
+        lines.append("}\n")
+    return "\n".join(lines)
+
+
+def talk_markdown(n, seed=0):
+    """{filename: text} for n _talks/ files as talks.py writes them; every 6th has no location."""
+    rng = random.Random(seed)
+    files = {}
+    for i in range(n):
+        date = _date(rng)
+        lines = ["---", f'title: "{_phrase(rng, 5).title()} {i}"', "collection: talks", 'type: "Talk"',
+                 f"permalink: /talks/{date}-talk-{i}", f'venue: "University of {_phrase(rng, 1).title()}"',
+                 f"date: {date}"]
+        if i % 6:
+            lines.append(f'location: "{rng.choice(PLACES)}"')
+        lines += ["---", "", f"This is a description of {_phrase(rng, 40)}.", ""]
+        files[f"{date}-talk-{i}.md"] = "\n".join(lines)
+    return files
+
+
+def orcid_works(n, seed=0):
+    """(ORCID /works response, {doi: Crossref message}) for a profile with n works.
+
+    Every 5th work has no DOI, every 9th DOI is unknown to Crossref (404), and every
+    11th work is listed twice in its group, as ORCID does for works from two sources."""
+    rng = random.Random(seed)
+    groups, messages = [], {}
+    for i in range(n):
+        year = rng.randint(2000, 2025)
+        title = _phrase(rng, 7).capitalize() + f" {i}"
+        summary = {
+            "put-code": 100000 + i,
+            "last-modified-date": {"value": 1600000000000 + i},
+            "title": {"title": {"value": title}},
+            "external-ids": {"external-id": []},
+            "publication-date": {"year": {"value": str(year)}, "month": None, "day": None},
+        }
+        if i % 5:
+            doi = f"10.5555/synthetic.{seed}.{i}"
+            summary["external-ids"]["external-id"].append(
+                {"external-id-type": "doi", "external-id-value": f"https://doi.org/{doi}"})
+            if i % 9:
+                messages[doi.lower()] = {
+                    "DOI": doi,
+                    "title": [title],
+                    "container-title": ["Journal of " + _phrase(rng, 2).title()],
+                    "author": [{"given": rng.choice(["Jane", "Gang", "Dai", "Paul"]),
+                                "family": rng.choice(["Doe", "Zhao", "Yamazaki", "Bates"])}
+                               for _ in range(rng.randint(1, 8))],
+                    "published-print": {"date-parts": [[year, rng.randint(1, 12), rng.randint(1, 28)]]},
+                    "created": {"date-parts": [[year, 1, 1]]},
+                    "reference-count": 40,
+                    "abstract": "<jats:p>" + _phrase(rng, 120) + "</jats:p>",
+                }
+        groups.append({"work-summary": [summary] * (2 if i % 11 == 0 else 1)})
+    return {"group": groups}, messages
+
+
+def orcid_work_detail(summary):
+    """The ORCID work detail (as returned by the bulk /works/{put-codes} endpoint) for a summary
+    from orcid_works(): contributors, journal title and a full publication date."""
+    rng = random.Random(summary["put-code"])
+    year = summary["publication-date"]["year"]["value"]
+    return {
+        "put-code": summary["put-code"],
+        "title": summary["title"],
+        "journal-title": {"value": "Journal of " + _phrase(rng, 2).title()},
+        "publication-date": {"year": {"value": year}, "month": {"value": f"{rng.randint(1, 12):02d}"},
+                             "day": {"value": f"{rng.randint(1, 28):02d}"}},
+        "external-ids": summary["external-ids"],
+        "contributors": {"contributor": [
+            {"credit-name": {"value": rng.choice(["Jane Doe", "Gang Zhao", "Dai Yamazaki", "Paul Bates"])},
+             "contributor-attributes": {"contributor-sequence": "first" if k == 0 else "additional",
+                                        "contributor-role": "author"}}
+            for k in range(rng.randint(1, 6))]},
+    }
+
+
+def openalex_works(works, messages, seed=0):
+    """OpenAlex /works results for an orcid_works() profile: one per work (the duplicate summaries
+    ORCID lists are merged, as OpenAlex does). Works Crossref does not know still get authors and a
+    venue here, which --cross-fill can copy over; every 7th work has no venue."""
+    rng = random.Random(seed)
+    out = []
+    for g in works["group"]:
+        summary = g["work-summary"][0]
+        ext = summary["external-ids"]["external-id"]
+        doi = ext[0]["external-id-value"] if ext else None
+        m = messages.get(doi[len("https://doi.org/"):].lower()) if doi else None
+        if m:
+            names = [f"{a['given']} {a['family']}" for a in m["author"]]
+            y, mo, d = m["published-print"]["date-parts"][0]
+            venue = m["container-title"][0]
+        else:
+            detail = orcid_work_detail(summary)
+            names = [c["credit-name"]["value"] for c in detail["contributors"]["contributor"]]
+            pd = detail["publication-date"]
+            y, mo, d = (int(pd[k]["value"]) for k in ("year", "month", "day"))
+            venue = detail["journal-title"]["value"]
+        out.append({
+            "id": f"https://openalex.org/W{summary['put-code']}",
+            "doi": doi,
+            "display_name": summary["title"]["title"]["value"],
+            "publication_date": f"{y:04d}-{mo:02d}-{d:02d}",
+            "primary_location": {"source": None if rng.random() < 1 / 7 else {"display_name": venue}},
+            "authorships": [{"author": {"display_name": n}} for n in names],
+        })
+    return out
@@ -0,0 +1,141 @@
+# coding: utf-8
+
+# # Parsed-BibTeX cache for pubsFromBib.py
+#
+# Parsing a large .bib file with pybtex dominates the runtime of `pubsFromBib.py`. `BibCache` keeps,
+# per `publist` source, the sha256 of the bib file, the source's settings, and for every entry its
+# fields, authors and rendered result, in `.bibcache.json` next to this script.
+#
+# - bib file and settings unchanged: entries and results come straight from the cache, no parsing
+#   (pybtex is not even imported) and no rendering.
+# - bib file changed: the file is reparsed, and only entries whose fields or authors changed are
+#   rendered again.
+# - settings changed (e.g. `venuekey` or `venue-pretext`): every entry of that source is rendered
+#   again, from the cached fields if the bib file itself did not change.
+#
+# The cache is also dropped entirely when the `salt` (the source of `render.py` and this module)
+# changes, so editing the render code never serves stale markdown; editing `publist` only re-renders
+# the sources whose settings changed. Delete `.bibcache.json` to start over. It is a local cache and
+# is not committed (see .gitignore).
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+from pybtex.utils import OrderedCaseInsensitiveDict
+
+CACHE_FILE = ".bibcache.json"
+
+# the part of pybtex.database.Person the generator uses
+Person = namedtuple("Person", ["first_names", "last_names"])
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _parse(filename):
+    """(bib_id, fields, persons) as plain lists for every entry in a bib file."""
+    from pybtex.database.input import bibtex
+    bibdata = bibtex.Parser().parse_file(filename)
+    parsed = []
+    for bib_id, entry in bibdata.entries.items():
+        fields = [[k, str(v)] for k, v in entry.fields.items()]
+        persons = {role: [[p.first_names, p.last_names] for p in people]
+                   for role, people in entry.persons.items()}
+        parsed.append((bib_id, fields, persons))
+    return parsed
+
+
+def entry_objects(fields, persons):
+    """Plain cached lists back to the case-insensitive fields / persons mappings pybtex provides."""
+    return (OrderedCaseInsensitiveDict(fields),
+            OrderedCaseInsensitiveDict((role, [Person(*p) for p in people]) for role, people in persons.items()))
+
+
+class BibCache:
+    def __init__(self, path=CACHE_FILE, salt=""):
+        self.path = path
+        self.salt = salt
+        self.sources = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("salt") == salt:
+                self.sources = data.get("sources") or {}
+        self.updated = {}
+        self._pending = {}
+        self.cached_sources = 0
+        self.rendered = 0
+        self.reused = 0
+
+    def _file_sha(self, filename):
+        with open(filename, "rb") as f:
+            return _sha256(f.read())
+
+    def preparse(self, sources, pool):
+        """Start parsing every changed bib file of `sources` ({name: (filename, settings)}) on `pool`."""
+        for name, (filename, settings) in sources.items():
+            sha = self._file_sha(filename)
+            if (self.sources.get(name) or {}).get("sha256") != sha and filename not in self._pending:
+                self._pending[filename] = pool.submit(_parse, filename)
+
+    def entries(self, name, filename, settings, render, pool=None, jobs=1):
+        """Yield (bib_id, result) for every entry of one source, calling render(bib_id, fields, persons)
+        only for entries that are new or changed; `result` is whatever render returned, so it must be
+        JSON-serialisable. With a process `pool` of `jobs` workers, render must be picklable and runs there
+        in chunks."""
+        sha = self._file_sha(filename)
+        settings_key = json.dumps(settings, sort_keys=True)
+        old = self.sources.get(name) or {}
+        old_entries = old.get("entries") or {}
+        same_settings = old.get("settings") == settings_key
+
+        if old.get("sha256") == sha and same_settings:
+            self.cached_sources += 1
+            self.reused += len(old_entries)
+            self.updated[name] = old
+            for bib_id, e in old_entries.items():
+                yield bib_id, e["result"]
+            return
+
+        if old.get("sha256") == sha:
+            parsed = [(bib_id, e["fields"], e["persons"]) for bib_id, e in old_entries.items()]
+        elif filename in self._pending:
+            parsed = self._pending.pop(filename).result()
+        else:
+            parsed = _parse(filename)
+
+        entries = {}
+        todo = []
+        for bib_id, fields, persons in parsed:
+            digest = _sha256(json.dumps([fields, persons], ensure_ascii=False).encode("utf-8"))
+            prev = old_entries.get(bib_id)
+            if same_settings and prev and prev["sha256"] == digest:
+                result = prev["result"]
+                self.reused += 1
+            else:
+                result = None
+                todo.append((bib_id, fields, persons))
+            entries[bib_id] = {"sha256": digest, "fields": fields, "persons": persons, "result": result}
+
+        if pool is not None and len(todo) > 1:
+            chunksize = max(1, len(todo) // (jobs * 4))
+            results = pool.map(render, *zip(*todo), chunksize=chunksize)
+        else:
+            results = (render(*t) for t in todo)
+        # map() keeps submission order, so the output is the same as rendering serially
+        for (bib_id, _, _), result in zip(todo, results):
+            entries[bib_id]["result"] = result
+        self.rendered += len(todo)
+
+        self.updated[name] = {"sha256": sha, "settings": settings_key, "entries": entries}
+        for bib_id, e in entries.items():
+            yield bib_id, e["result"]
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"salt": self.salt, "sources": self.updated}, f, ensure_ascii=False, separators=(",", ":"))
+        print(f"bibcache: {self.cached_sources} of {len(self.updated)} sources unchanged, "
+              f"{self.reused} entries reused, {self.rendered} rendered")
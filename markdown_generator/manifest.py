@@ -0,0 +1,107 @@
+# coding: utf-8
+
+# # Content-hash manifest for the markdown generators
+#
+# `publications.py`, `talks.py` and `pubsFromBib.py` used to rewrite every .md file on every run,
+# which bumps mtimes and makes Jekyll regenerate the whole collection. They now write through a
+# `Manifest`, which remembers the sha256, size and mtime of every file it generated (in
+# `.manifest.json`, next to this script) and leaves a file alone when its content would not change.
+# A file whose size or mtime no longer matches the record (edited or damaged by hand) is hashed
+# again and restored if it differs, so rerunning a generator still resets its outputs.
+#
+# `.manifest.json` is local state and is not committed (see .gitignore); on a fresh clone the
+# existing files are hashed once and only the ones that differ are rewritten.
+#
+# Files a generator produced on an earlier run but not on this one (a deleted TSV row or bib entry)
+# are reported as orphans. Run the generator with `--prune` to delete them; a file that was edited
+# by hand since it was generated is never deleted.
+
+import argparse
+import hashlib
+import json
+import locale
+import os
+
+MANIFEST_FILE = ".manifest.json"
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def prune_requested():
+    """True if the generator was started with --prune (unknown arguments, e.g. Jupyter's, are ignored)."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--prune", action="store_true")
+    return parser.parse_known_args()[0].prune
+
+
+class Manifest:
+    def __init__(self, generator, path=MANIFEST_FILE):
+        self.generator = generator
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        self.produced = set()
+        self.written = 0
+        self.unchanged = 0
+
+    def write(self, filename, text, encoding=None):
+        """Write `text` to `filename` unless the file already holds exactly that content."""
+        data = text.encode(encoding or locale.getpreferredencoding(False))
+        digest = _sha256(data)
+        self.produced.add(filename)
+        old = self.entries.get(filename)
+        try:
+            st = os.stat(filename)
+        except FileNotFoundError:
+            st = None
+        if st is not None:
+            if old and old["sha256"] == digest and old.get("size") == st.st_size \
+                    and old.get("mtime_ns") == st.st_mtime_ns:
+                self.unchanged += 1
+                return False
+            # no record yet (first run, or a fresh clone), or the file was touched since it was
+            # written (e.g. edited by hand): compare against the file itself
+            with open(filename, "rb") as f:
+                if _sha256(f.read()) == digest:
+                    self._record(filename, digest, st)
+                    self.unchanged += 1
+                    return False
+        with open(filename, "wb") as f:
+            f.write(data)
+        self._record(filename, digest, os.stat(filename))
+        self.written += 1
+        return True
+
+    def _record(self, filename, digest, st):
+        self.entries[filename] = {"sha256": digest, "generator": self.generator,
+                                  "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    def orphans(self):
+        return sorted(fn for fn, e in self.entries.items()
+                      if e["generator"] == self.generator and fn not in self.produced)
+
+    def finish(self, prune=False):
+        """Report (or with prune=True, delete) orphans, then save the manifest."""
+        orphans = self.orphans()
+        for fn in orphans:
+            if not os.path.exists(fn):
+                del self.entries[fn]
+                continue
+            if not prune:
+                print(f"ORPHAN {fn} (no longer generated; rerun with --prune to delete)")
+                continue
+            with open(fn, "rb") as f:
+                edited = _sha256(f.read()) != self.entries[fn]["sha256"]
+            if edited:
+                print(f"ORPHAN {fn} was edited by hand, not deleting")
+                continue
+            os.remove(fn)
+            del self.entries[fn]
+            print(f"REMOVED {fn}")
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        print(f"{self.generator}: {self.written} written, {self.unchanged} unchanged, {len(orphans)} orphaned")
@@ -17,92 +17,49 @@
 # - `url_slug` will be the descriptive part of the .md file and the permalink URL for the page about the paper. The .md file will be `YYYY-MM-DD-[url_slug].md` and the permalink will be `https://[yourdomain]/publications/YYYY-MM-DD-[url_slug]`
 
 
-# ## Import pandas
-# 
-# We are using the very handy pandas library for dataframes.
-
-# In[2]:
-
-import pandas as pd
-
-
 # ## Import TSV
 # 
-# Pandas makes this easy with the read_csv function. We are using a TSV, so we specify the separator as a tab, or `\t`.
+# The TSV is streamed one row at a time with the csv module (see `tsv.py`), so each row is rendered and written before the next is read and pandas is not needed. Run with `--pandas` to load it with pandas' read_csv instead.
 # 
-# I found it important to put this data in a tab-separated values format, because there are a lot of commas in this kind of data and comma-separated values can get messed up. However, you can modify the import statement, as pandas also has read_excel(), read_json(), and others.
+# I found it important to put this data in a tab-separated values format, because there are a lot of commas in this kind of data and comma-separated values can get messed up.
 
 # In[3]:
 
-publications = pd.read_csv("publications.tsv", sep="\t", header=0)
-publications
+import sys
 
+sys.path.insert(0, "../scripts")
+from metrics import metrics_from_args
+from tsv import read_tsv
 
-# ## Escape special characters
-# 
-# YAML is very picky about how it takes a valid string, so we are replacing single and double quotes (and ampersands) with their HTML encoded equivilents. This makes them look not so readable in raw format, but they are parsed and rendered nicely.
+# `--metrics FILE` / `--profile FILE` record timings, counts and peak memory (see scripts/metrics.py)
+metrics = metrics_from_args("publications")
 
-# In[4]:
-
-html_escape_table = {
-    "&": "&amp;",
-    '"': "&quot;",
-    "'": "&apos;"
-    }
-
-def html_escape(text):
-    """Produce entities within text."""
-    return "".join(html_escape_table.get(c,c) for c in text)
+# read_tsv() is lazy: rows are parsed as the loop below asks for them, and timed there
+publications = metrics.timed("read", read_tsv("publications.tsv"))
 
 
 # ## Creating the markdown files
 # 
-# This is where the heavy lifting is done. This loops through all the rows in the TSV dataframe, then starts to concatentate a big string (```md```) that contains the markdown for each type. It does the YAML metadata first, then does the description for the individual page. If you don't want something to appear (like the "Recommended citation")
+# This is where the heavy lifting is done. This loops through all the rows in the TSV and renders each one with `render_publication()` from `render.py`, which fills in the YAML metadata first (escaping quotes and ampersands, because YAML is very picky about how it takes a valid string), then the description for the individual page. If you don't want something to appear (like the "Recommended citation"), change it there.
 
 # In[5]:
 
-import os
-for row, item in publications.iterrows():
-    
-    md_filename = str(item.pub_date) + "-" + item.url_slug + ".md"
-    html_filename = str(item.pub_date) + "-" + item.url_slug
-    year = item.pub_date[:4]
-    
-    ## YAML variables
-    
-    md = "---\ntitle: \""   + item.title + '"\n'
-    
-    md += """collection: publications"""
-    
-    md += """\npermalink: /publication/""" + html_filename
-    
-    if len(str(item.excerpt)) > 5:
-        md += "\nexcerpt: '" + html_escape(item.excerpt) + "'"
-    
-    md += "\ndate: " + str(item.pub_date) 
-    
-    md += "\nvenue: '" + html_escape(item.venue) + "'"
-    
-    if len(str(item.paper_url)) > 5:
-        md += "\npaperurl: '" + item.paper_url + "'"
-    
-    md += "\ncitation: '" + html_escape(item.citation) + "'"
-    
-    md += "\n---"
-    
-    ## Markdown description for individual page
-    
-    if len(str(item.paper_url)) > 5:
-        md += "\n\n<a href='" + item.paper_url + "'>Download paper here</a>\n" 
-        
-    if len(str(item.excerpt)) > 5:
-        md += "\n" + html_escape(item.excerpt) + "\n"
-        
-    md += "\nRecommended citation: " + item.citation
-    
-    md_filename = os.path.basename(md_filename)
-       
-    with open("../_publications/" + md_filename, 'w') as f:
-        f.write(md)
+from manifest import Manifest, prune_requested
+from render import render_publication
+
+manifest = Manifest("publications")
+
+# "generate" includes streaming the rows in: generate = read + render + write
+with metrics.phase("generate"):
+    for item in publications:
+        with metrics.phase("render"):
+            md_filename, md = render_publication(item)
+        with metrics.phase("write"):
+            manifest.write("../_publications/" + md_filename, md)
+
+manifest.finish(prune=prune_requested())
+metrics.count("written", manifest.written)
+metrics.count("unchanged", manifest.unchanged)
+metrics.finish()
 
 
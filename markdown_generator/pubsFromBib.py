@@ -16,13 +16,18 @@
 # TODO: Merge this with the existing TSV parsing solution
 
 
-from pybtex.database.input import bibtex
-import pybtex.database.input.bibtex 
-from time import strptime
-import string
-import html
+import argparse
+import hashlib
 import os
-import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from bibcache import BibCache
+from render import render_plain
+from manifest import Manifest, prune_requested
+
+sys.path.insert(0, "../scripts")
+from metrics import metrics_from_args
 
 #todo: incorporate different collection types rather than a catch all publications, requires other changes to template
 publist = {
@@ -43,118 +48,72 @@ publist = {
     } 
 }
 
-html_escape_table = {
-    "&": "&amp;",
-    '"': "&quot;",
-    "'": "&apos;"
-    }
-
-def html_escape(text):
-    """Produce entities within text."""
-    return "".join(html_escape_table.get(c,c) for c in text)
-
-
-for pubsource in publist:
-    parser = bibtex.Parser()
-    bibdata = parser.parse_file(publist[pubsource]["file"])
-
-    #loop through the individual references in a given bibtex file
-    for bib_id in bibdata.entries:
-        #reset default date
-        pub_year = "1900"
-        pub_month = "01"
-        pub_day = "01"
-        
-        b = bibdata.entries[bib_id].fields
-        
-        try:
-            pub_year = f'{b["year"]}'
-
-            #todo: this hack for month and day needs some cleanup
-            if "month" in b.keys(): 
-                if(len(b["month"])<3):
-                    pub_month = "0"+b["month"]
-                    pub_month = pub_month[-2:]
-                elif(b["month"] not in range(12)):
-                    tmnth = strptime(b["month"][:3],'%b').tm_mon   
-                    pub_month = "{:02d}".format(tmnth) 
-                else:
-                    pub_month = str(b["month"])
-            if "day" in b.keys(): 
-                pub_day = str(b["day"])
-
-                
-            pub_date = pub_year+"-"+pub_month+"-"+pub_day
-            
-            #strip out {} as needed (some bibtex entries that maintain formatting)
-            clean_title = b["title"].replace("{", "").replace("}","").replace("\\","").replace(" ","-")    
-
-            url_slug = re.sub("\\[.*\\]|[^a-zA-Z0-9_-]", "", clean_title)
-            url_slug = url_slug.replace("--","-")
-
-            md_filename = (str(pub_date) + "-" + url_slug + ".md").replace("--","-")
-            html_filename = (str(pub_date) + "-" + url_slug).replace("--","-")
-
-            #Build Citation from text
-            citation = ""
-
-            #citation authors - todo - add highlighting for primary author?
-            for author in bibdata.entries[bib_id].persons["author"]:
-                citation = citation+" "+author.first_names[0]+" "+author.last_names[0]+", "
-
-            #citation title
-            citation = citation + "\"" + html_escape(b["title"].replace("{", "").replace("}","").replace("\\","")) + ".\""
-
-            #add venue logic depending on citation type
-            venue = publist[pubsource]["venue-pretext"]+b[publist[pubsource]["venuekey"]].replace("{", "").replace("}","").replace("\\","")
-
-            citation = citation + " " + html_escape(venue)
-            citation = citation + ", " + pub_year + "."
-
-            
-            ## YAML variables
-            md = "---\ntitle: \""   + html_escape(b["title"].replace("{", "").replace("}","").replace("\\","")) + '"\n'
-            
-            md += """collection: """ +  publist[pubsource]["collection"]["name"]
-
-            md += """\npermalink: """ + publist[pubsource]["collection"]["permalink"]  + html_filename
-            
-            note = False
-            if "note" in b.keys():
-                if len(str(b["note"])) > 5:
-                    md += "\nexcerpt: '" + html_escape(b["note"]) + "'"
-                    note = True
-
-            md += "\ndate: " + str(pub_date) 
-
-            md += "\nvenue: '" + html_escape(venue) + "'"
-            
-            url = False
-            if "url" in b.keys():
-                if len(str(b["url"])) > 5:
-                    md += "\npaperurl: '" + b["url"] + "'"
-                    url = True
-
-            md += "\ncitation: '" + html_escape(citation) + "'"
-
-            md += "\n---"
-
-            
-            ## Markdown description for individual page
-            if note:
-                md += "\n" + html_escape(b["note"]) + "\n"
-
-            if url:
-                md += "\n[Access paper here](" + b["url"] + "){:target=\"_blank\"}\n" 
-            else:
-                md += "\nUse [Google Scholar](https://scholar.google.com/scholar?q="+html.escape(clean_title.replace("-","+"))+"){:target=\"_blank\"} for full citation"
-
-            md_filename = os.path.basename(md_filename)
-
-            with open("../_publications/" + md_filename, 'w', encoding="utf-8") as f:
-                f.write(md)
-            print(f'SUCESSFULLY PARSED {bib_id}: \"', b["title"][:60],"..."*(len(b['title'])>60),"\"")
-        # field may not exist for a reference
-        except KeyError as e:
-            print(f'WARNING Missing Expected Field {e} from entry {bib_id}: \"', b["title"][:30],"..."*(len(b['title'])>30),"\"")
-            continue
+# ## Parse the bib files and write the markdown
+#
+# The markdown for each entry is built by `render_entry()` in `render.py`. Parsed entries and their
+# rendered markdown are cached in `.bibcache.json` (see `bibcache.py`), so unchanged bib files are not
+# reparsed and only new or edited entries are rendered again.
+#
+# With `--jobs N`, changed bib files are parsed concurrently and entries are rendered in chunks on N
+# worker processes. Results are collected in `publist` order and written once at the end, so the output
+# is byte-identical to the default serial run.
+#
+# Two entries that produce the same `YYYY-MM-DD-slug.md` used to overwrite each other silently; the
+# later one still wins, but the collision is now reported.
+#
+# `--metrics FILE` / `--profile FILE` record timings, cache counts and peak memory of the main
+# process (see scripts/metrics.py).
+
+def main():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--jobs", type=int, default=1)
+    jobs = parser.parse_known_args()[0].jobs
+    metrics = metrics_from_args("pubsFromBib")
+
+    with metrics.phase("load_cache"):
+        here = os.path.dirname(os.path.abspath(__file__))
+        salt = hashlib.sha256()
+        # the render code only: `publist` changes are caught by each source's settings key
+        for source in ("render.py", "bibcache.py"):
+            with open(os.path.join(here, source), "rb") as f:
+                salt.update(f.read())
+        bibcache = BibCache(salt=salt.hexdigest())
+        manifest = Manifest("pubsFromBib")
+    pool = ProcessPoolExecutor(jobs) if jobs > 1 else None
+    if pool:
+        bibcache.preparse({name: (src["file"], src) for name, src in publist.items()}, pool)
+
+    outputs = {}
+    with metrics.phase("parse_render"):
+        for pubsource in publist:
+            #loop through the individual references in a given bibtex file
+            for bib_id, (md_filename, md, message) in bibcache.entries(
+                    pubsource, publist[pubsource]["file"], publist[pubsource],
+                    partial(render_plain, publist[pubsource]), pool=pool, jobs=jobs):
+                print(message)
+                if not md_filename:
+                    metrics.count("missing_field")
+                    continue
+                if md_filename in outputs:
+                    print(f"WARNING {md_filename} from entry {bib_id} overwrites the one from entry {outputs[md_filename][0]}")
+                    metrics.count("collisions")
+                outputs[md_filename] = (bib_id, md)
+
+    if pool:
+        pool.shutdown()
+
+    with metrics.phase("write"):
+        for md_filename, (bib_id, md) in outputs.items():
+            manifest.write("../_publications/" + md_filename, md, encoding="utf-8")
+
+    with metrics.phase("save"):
+        bibcache.save()
+        manifest.finish(prune=prune_requested())
+    for name, n in (("rendered", bibcache.rendered), ("reused", bibcache.reused),
+                    ("written", manifest.written), ("unchanged", manifest.unchanged)):
+        metrics.count(name, n)
+    metrics.finish()
+
+# worker processes re-import this file, so only the main process may run the generator
+if __name__ == "__main__":
+    main()
@@ -7,12 +7,6 @@
 # 
 # TODO: Make this work with BibTex and other databases, rather than Stuart's non-standard TSV format and citation style.
 
-# In[1]:
-
-import pandas as pd
-import os
-
-
 # ## Data format
 # 
 # The TSV needs to have the following columns: title, type, url_slug, venue, date, location, talk_url, description, with a header at the top. Many of these fields can be blank, but the columns must be in the TSV.
@@ -27,84 +21,48 @@ import os
 
 # ## Import TSV
 # 
-# Pandas makes this easy with the read_csv function. We are using a TSV, so we specify the separator as a tab, or `\t`.
+# The TSV is streamed one row at a time with the csv module (see `tsv.py`), so each row is rendered and written before the next is read and pandas is not needed. Run with `--pandas` to load it with pandas' read_csv instead.
 # 
-# I found it important to put this data in a tab-separated values format, because there are a lot of commas in this kind of data and comma-separated values can get messed up. However, you can modify the import statement, as pandas also has read_excel(), read_json(), and others.
+# I found it important to put this data in a tab-separated values format, because there are a lot of commas in this kind of data and comma-separated values can get messed up.
 
 # In[3]:
 
-talks = pd.read_csv("talks.tsv", sep="\t", header=0)
-talks
+import sys
 
+sys.path.insert(0, "../scripts")
+from metrics import metrics_from_args
+from tsv import read_tsv
 
-# ## Escape special characters
-# 
-# YAML is very picky about how it takes a valid string, so we are replacing single and double quotes (and ampersands) with their HTML encoded equivilents. This makes them look not so readable in raw format, but they are parsed and rendered nicely.
-
-# In[4]:
+# `--metrics FILE` / `--profile FILE` record timings, counts and peak memory (see scripts/metrics.py)
+metrics = metrics_from_args("talks")
 
-html_escape_table = {
-    "&": "&amp;",
-    '"': "&quot;",
-    "'": "&apos;"
-    }
-
-def html_escape(text):
-    if type(text) is str:
-        return "".join(html_escape_table.get(c,c) for c in text)
-    else:
-        return "False"
+# read_tsv() is lazy: rows are parsed as the loop below asks for them, and timed there
+talks = metrics.timed("read", read_tsv("talks.tsv"))
 
 
 # ## Creating the markdown files
 # 
-# This is where the heavy lifting is done. This loops through all the rows in the TSV dataframe, then starts to concatentate a big string (```md```) that contains the markdown for each type. It does the YAML metadata first, then does the description for the individual page.
+# This is where the heavy lifting is done. This loops through all the rows in the TSV and renders each one with `render_talk()` from `render.py`, which fills in the YAML metadata first (escaping quotes and ampersands in the description, because YAML is very picky about how it takes a valid string), then the description for the individual page.
 
 # In[5]:
 
-loc_dict = {}
-
-for row, item in talks.iterrows():
-    
-    md_filename = str(item.date) + "-" + item.url_slug + ".md"
-    html_filename = str(item.date) + "-" + item.url_slug 
-    year = item.date[:4]
-    
-    md = "---\ntitle: \""   + item.title + '"\n'
-    md += "collection: talks" + "\n"
-    
-    if len(str(item.type)) > 3:
-        md += 'type: "' + item.type + '"\n'
-    else:
-        md += 'type: "Talk"\n'
-    
-    md += "permalink: /talks/" + html_filename + "\n"
-    
-    if len(str(item.venue)) > 3:
-        md += 'venue: "' + item.venue + '"\n'
-        
-    if len(str(item.location)) > 3:
-        md += "date: " + str(item.date) + "\n"
-    
-    if len(str(item.location)) > 3:
-        md += 'location: "' + str(item.location) + '"\n'
-           
-    md += "---\n"
-    
-    
-    if len(str(item.talk_url)) > 3:
-        md += "\n[More information here](" + item.talk_url + ")\n" 
-        
-    
-    if len(str(item.description)) > 3:
-        md += "\n" + html_escape(item.description) + "\n"
-        
-        
-    md_filename = os.path.basename(md_filename)
-    #print(md)
-    
-    with open("../_talks/" + md_filename, 'w') as f:
-        f.write(md)
+from manifest import Manifest, prune_requested
+from render import render_talk
+
+manifest = Manifest("talks")
+
+# "generate" includes streaming the rows in: generate = read + render + write
+with metrics.phase("generate"):
+    for item in talks:
+        with metrics.phase("render"):
+            md_filename, md = render_talk(item)
+        with metrics.phase("write"):
+            manifest.write("../_talks/" + md_filename, md)
+
+manifest.finish(prune=prune_requested())
+metrics.count("written", manifest.written)
+metrics.count("unchanged", manifest.unchanged)
+metrics.finish()
 
 
 # These files are in the talks directory, one directory below where we're working from.
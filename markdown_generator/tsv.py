@@ -0,0 +1,59 @@
+# coding: utf-8
+
+# # Streaming TSV reader for the markdown generators
+#
+# `publications.py` and `talks.py` used to load their TSV with `pandas.read_csv` and walk it with
+# `DataFrame.iterrows()`. Importing pandas alone takes longer than generating a typical site, and
+# the whole frame sits in memory. `read_tsv()` instead yields one row at a time from the `csv`
+# module, so a generator renders and writes each row before reading the next.
+#
+# Rows keep the pandas column semantics the generators rely on: attribute access by column name
+# (`item.title`), and empty cells (or pandas' default NA markers such as `NA` or `null`) come back as
+# "", which fails the same `len(str(x)) > 5` blank checks that NaN ("nan") failed before.
+#
+# Pass `--pandas` to a generator to read the TSV through pandas as before.
+
+import argparse
+import csv
+from collections import namedtuple
+
+# pandas.read_csv's default na_values
+NA_VALUES = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+])
+
+
+def pandas_requested():
+    """True if the generator was started with --pandas (unknown arguments are ignored)."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--pandas", action="store_true")
+    return parser.parse_known_args()[0].pandas
+
+
+def stream_tsv(path):
+    """Yield the rows of a tab-separated file with a header line, one namedtuple per row."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter="\t")
+        header = next(reader)
+        Row = namedtuple("Row", header, rename=True)
+        width = len(header)
+        for fields in reader:
+            if not any(fields):
+                continue    # pandas skips blank lines too
+            fields = ["" if v in NA_VALUES else v for v in fields[:width]]
+            fields += [""] * (width - len(fields))
+            yield Row(*fields)
+
+
+def pandas_tsv(path):
+    import pandas as pd
+    for row, item in pd.read_csv(path, sep="\t", header=0).iterrows():
+        yield item
+
+
+def read_tsv(path, use_pandas=None):
+    """Rows of `path`, streamed with csv unless use_pandas (default: the --pandas flag) is set."""
+    if use_pandas is None:
+        use_pandas = pandas_requested()
+    return pandas_tsv(path) if use_pandas else stream_tsv(path)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# # Watch mode for the markdown generators
+#
+# Rerunning `publications.py`, `talks.py` or `pubsFromBib.py` after every edit means starting Python,
+# re-reading every row and, for the bib files, reparsing the whole bibliography with pybtex. This
+# script stays running instead and polls the inputs (no extra dependency; a `stat()` per file every
+# `--interval` seconds). Once a changed file has been quiet for `--debounce` seconds:
+#
+# - `publications.tsv` / `talks.tsv`: rows are compared by content with the previous version; only new
+#   or edited rows are rendered again.
+# - `pubs.bib` / `proceedings.bib` (the `publist` sources of `pubsFromBib.py`): the file is split into
+#   its `@entry{...}` blocks and only new or edited blocks are parsed with pybtex and rendered. An edit
+#   to an `@string` or `@preamble` block reparses the whole file, since any entry may use it.
+#
+# Files are written through the same `Manifest` (and generator names) as the one-off scripts, so an
+# unchanged file is never touched and `jekyll serve` only rebuilds the pages that changed. Rows or
+# entries that disappear leave orphans, reported as usual or deleted with `--prune`.
+#
+#     python watch.py                  # from markdown_generator/, next to `jekyll serve`
+#     python watch.py --once           # one pass, e.g. to compare with the one-off scripts
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+
+from manifest import Manifest
+from render import render_publication, render_talk
+from tsv import stream_tsv
+
+# (generator, input, output directory, render function) for the TSV generators
+TSV_SOURCES = (
+    ("publications", "publications.tsv", "../_publications/", render_publication),
+    ("talks", "talks.tsv", "../_talks/", render_talk),
+)
+ENTRY_START = re.compile(r"^[ \t]*@", re.MULTILINE)
+ENTRY_KEY = re.compile(r"\s*@\w+\s*[{(]\s*([^,\s]+)\s*,")
+MACRO_TYPES = ("@string", "@preamble", "@comment")
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TsvWatch:
+    """Renders one TSV, remembering {row digest: (md_filename, md)} between passes."""
+
+    def __init__(self, path, out_dir, render, manifest):
+        self.path, self.out_dir, self.render = path, out_dir, render
+        self.manifest = manifest
+        self.rows = {}
+
+    def update(self):
+        rows = {}
+        rendered = 0
+        for item in stream_tsv(self.path):
+            key = _digest("\t".join(item))
+            if key not in self.rows:
+                self.rows[key] = self.render(item)
+                rendered += 1
+            rows[key] = self.rows[key]
+        self.rows = rows
+        for md_filename, md in rows.values():
+            self.manifest.write(self.out_dir + md_filename, md)
+        return rendered
+
+
+def split_bib(text):
+    """The blocks of a bib file, each starting at an "@" at the beginning of a line."""
+    starts = [m.start() for m in ENTRY_START.finditer(text)]
+    return [text[a:b] for a, b in zip(starts, starts[1:] + [len(text)])]
+
+
+class BibWatch:
+    """Renders the `publist` sources of pubsFromBib.py, parsing only new or edited @entry blocks."""
+
+    def __init__(self, publist, manifest):
+        self.publist = publist
+        self.manifest = manifest
+        self.blocks = {}    # source -> {block digest: [(md_filename, md, message)]}
+        self.macros = {}    # source -> digest of its @string / @preamble blocks
+
+    def _parse(self, settings, macro_text, blocks):
+        """{block: [render_entry() result]} for the given entry blocks of one source, parsed in one go."""
+        from pybtex import errors
+        from pybtex.database import parse_string
+        from render import render_entry
+        errors.set_strict_mode(False)    # a duplicate key must not stop the watcher
+        bibdata = parse_string(macro_text + "".join(blocks), "bibtex")
+        out = {}
+        for block in blocks:
+            m = ENTRY_KEY.match(block)
+            entry = bibdata.entries.get(m.group(1)) if m else None
+            out[block] = [render_entry(settings, m.group(1), entry.fields, entry.persons)] if entry else []
+        return out
+
+    def update(self):
+        outputs = {}
+        parsed = 0
+        for name, settings in self.publist.items():
+            with open(settings["file"], encoding="utf-8") as f:
+                blocks = split_bib(f.read())
+            macro_text = "".join(b for b in blocks if b.lstrip().lower().startswith(MACRO_TYPES))
+            entries = [b for b in blocks if not b.lstrip().lower().startswith(MACRO_TYPES)]
+            old = self.blocks.get(name) or {}
+            if self.macros.get(name) != _digest(macro_text):
+                old = {}
+            todo = [b for b in entries if _digest(b) not in old]
+            fresh = self._parse(settings, macro_text, todo) if todo else {}
+            parsed += len(todo)
+            current = {}
+            for block in entries:
+                key = _digest(block)
+                current[key] = old[key] if key in old else fresh[block]
+                for md_filename, md, message in current[key]:
+                    if not md_filename:
+                        if key not in old:
+                            print(message)
+                        continue
+                    if md_filename in outputs:
+                        print(f"WARNING {md_filename} is generated by more than one entry; the later one wins")
+                    outputs[md_filename] = md
+            self.blocks[name] = current
+            self.macros[name] = _digest(macro_text)
+        for md_filename, md in outputs.items():
+            self.manifest.write("../_publications/" + md_filename, md, encoding="utf-8")
+        return parsed
+
+
+def mtimes(paths):
+    out = {}
+    for p in paths:
+        try:
+            st = os.stat(p)
+            out[p] = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            out[p] = None
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate _publications/ and _talks/ as the inputs change.")
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between polls")
+    parser.add_argument("--debounce", type=float, default=0.3, help="seconds a change must be quiet before regenerating")
+    parser.add_argument("--prune", action="store_true", help="delete files whose row or entry was removed")
+    parser.add_argument("--once", action="store_true", help="run one pass and exit")
+    args = parser.parse_args()
+
+    # one shared manifest: several Manifest objects saving the same file would undo each other's entries
+    manifests = {g: Manifest(g) for g in [g for g, _, _, _ in TSV_SOURCES] + ["pubsFromBib"]}
+    for manifest in manifests.values():
+        manifest.entries = manifests["pubsFromBib"].entries
+
+    watchers = {}   # input file -> (generator, watcher)
+    for generator, path, out_dir, render in TSV_SOURCES:
+        if os.path.exists(path):
+            watchers[path] = (generator, TsvWatch(path, out_dir, render, manifests[generator]))
+    try:
+        from pubsFromBib import publist
+    except ImportError as e:   # pybtex missing: watch the TSVs only
+        print(f"not watching bib files: {e}")
+    else:
+        bib = BibWatch({n: s for n, s in publist.items() if os.path.exists(s["file"])}, manifests["pubsFromBib"])
+        for settings in bib.publist.values():
+            watchers[settings["file"]] = ("pubsFromBib", bib)
+
+    def run(paths):
+        t0 = time.perf_counter()
+        done = set()
+        for path in paths:
+            generator, watcher = watchers[path]
+            if id(watcher) in done:
+                continue
+            done.add(id(watcher))
+            manifest = manifests[generator]
+            manifest.written = manifest.unchanged = 0
+            n = watcher.update()
+            if isinstance(watcher, TsvWatch):
+                manifest.produced = {watcher.out_dir + fn for fn, _ in watcher.rows.values()}
+            else:
+                manifest.produced = {"../_publications/" + fn for blocks in watcher.blocks.values()
+                                     for results in blocks.values() for fn, _, _ in results if fn}
+            print(f"{generator}: {n} rows/entries rendered")
+            manifest.finish(prune=args.prune)
+        print(f"regenerated in {time.perf_counter() - t0:.3f}s")
+
+    run(list(watchers))
+    if args.once:
+        return
+    seen = mtimes(watchers)
+    print(f"watching {', '.join(watchers)} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(args.interval)
+            now = mtimes(watchers)
+            if now == seen:
+                continue
+            # debounce: editors often write a file in several steps
+            while True:
+                time.sleep(args.debounce)
+                later = mtimes(watchers)
+                if later == now:
+                    break
+                now = later
+            changed = [p for p in watchers if now[p] != seen[p] and now[p] is not None]
+            seen = now
+            try:
+                run(changed)
+            except Exception as e:   # a half-saved file must not end the watch
+                print(f"ERROR {type(e).__name__}: {e}", file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of Crossref /works/{doi} responses for update_publications_orcid.py.
+
+- SQLite file (default _data/.cache/crossref.sqlite), keyed by canon_doi(doi).lower().
+- Stores only the message fields the updater maps, plus ETag / Last-Modified.
+- 404s are cached too (message = NULL), so dead DOIs are not re-asked every week.
+- Entries older than `ttl_days` are "stale": the caller revalidates them with
+  If-None-Match / If-Modified-Since and calls touch() on a 304.
+- At most `max_entries` rows are kept; least recently used rows go first.
+- Writes are committed every `commit_every` puts/touches and on close(), so a run that
+  is killed or times out keeps nearly everything it downloaded.
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+# fields of the Crossref message that crossref_by_doi() reads
+FIELDS = ("title", "container-title", "author",
+          "published-print", "published", "published-online", "created")
+AUTHOR_FIELDS = ("given", "family", "name")
+
+
+def canon_doi(doi: str) -> str:
+    if not doi:
+        return ""
+    doi = doi.strip()
+    for pref in ("https://doi.org/", "http://doi.org/", "doi:"):
+        if doi.lower().startswith(pref):
+            doi = doi[len(pref):]
+            break
+    return doi.strip().strip('/')
+
+
+def trim_message(m: Dict) -> Dict:
+    """Drop everything crossref_by_doi() never looks at (references, licenses, ...)."""
+    out = {k: m[k] for k in FIELDS if k in m}
+    if "author" in out:
+        out["author"] = [{k: a[k] for k in AUTHOR_FIELDS if k in a} for a in out["author"] or []]
+    return out
+
+
+class Entry(NamedTuple):
+    message: Optional[Dict]   # None = cached 404
+    etag: str
+    last_modified: str
+    fresh: bool
+
+
+class CrossrefCache:
+    def __init__(self, path: Path, ttl_days: float = 30, max_entries: int = 20000, commit_every: int = 50):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.commit_every = commit_every
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS crossref ("
+            " doi TEXT PRIMARY KEY, message TEXT, etag TEXT, last_modified TEXT,"
+            " fetched_at REAL, used_at REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS crossref_used ON crossref(used_at)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[Entry]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT message, etag, last_modified, fetched_at FROM crossref WHERE doi = ?",
+                (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE crossref SET used_at = ? WHERE doi = ?", (now, key))
+        msg, etag, lm, fetched = row
+        return Entry(json.loads(msg) if msg is not None else None,
+                     etag or "", lm or "", now - fetched < self.ttl)
+
+    def put(self, key: str, message: Optional[Dict], etag: str = "", last_modified: str = "") -> None:
+        now = time.time()
+        body = json.dumps(message, ensure_ascii=False, separators=(",", ":")) if message is not None else None
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO crossref VALUES (?, ?, ?, ?, ?, ?)",
+                (key, body, etag or "", last_modified or "", now, now))
+            self._written()
+
+    def touch(self, key: str) -> None:
+        """Server answered 304: the cached copy is fresh for another TTL."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE crossref SET fetched_at = ?, used_at = ? WHERE doi = ?",
+                             (now, now, key))
+            self._written()
+
+    def _written(self) -> None:
+        # caller holds the lock
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self._db.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM crossref WHERE doi IN ("
+                " SELECT doi FROM crossref ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,))
+            self._db.commit()
+            self._db.close()
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Front-matter index for a Jekyll collection folder (_talks/, _publications/, ...).
+
+- Only the YAML header of each .md file is read: the file is read in 4 KiB chunks
+  until the closing "---" (at most `max_header_bytes`), never the body.
+- The header is parsed as flat `key: value` lines, which is what every collection
+  in this site uses; headers with nested YAML (lists, indented blocks) go through
+  yaml.safe_load when PyYAML is installed. Values are kept as strings.
+- The index of every field of every file is cached in _data/.cache/frontmatter/
+  and reused per file while its mtime and size are unchanged, so a rescan only
+  reads new or edited files.
+
+    index = FrontMatterIndex("_talks")
+    for name, fields in index.items():
+        ...
+    index.field("location")   # {filename: location} for files that have one
+
+    python scripts/frontmatter.py _talks              # whole index as JSON
+    python scripts/frontmatter.py _talks location     # one field
+"""
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / "_data" / ".cache" / "frontmatter"
+CHUNK = 4096
+MARKER = b"---"
+
+
+def read_header(path, max_header_bytes: int = 64 * 1024) -> Optional[str]:
+    """The text between the opening and closing "---" lines, or None if there is no front matter."""
+    with open(path, "rb") as f:
+        data = f.read(CHUNK)
+        if not data.startswith(MARKER):
+            return None
+        start = data.find(b"\n") + 1
+        while True:
+            end = data.find(b"\n" + MARKER, start - 1)
+            if end != -1:
+                return data[start:end + 1].decode("utf-8", errors="replace")
+            if len(data) >= max_header_bytes:
+                return None
+            more = f.read(CHUNK)
+            if not more:
+                return None
+            data += more
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        inner = value[1:-1]
+        return inner.replace("''", "'") if value[0] == "'" else inner.replace('\\"', '"')
+    return value
+
+
+def parse_header(text: str) -> Dict[str, str]:
+    fields = {}
+    for line in text.splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        key, sep, value = line.partition(":")
+        if line[0] in " \t-" or not sep:
+            return _parse_yaml(text, fields)
+        fields[key.strip()] = _unquote(value.strip())
+    return fields
+
+
+def _parse_yaml(text: str, flat: Dict[str, str]) -> Dict:
+    try:
+        import yaml
+    except ImportError:
+        return flat
+    try:
+        data = yaml.safe_load(text)
+    except yaml.YAMLError:
+        return flat
+    if not isinstance(data, dict):
+        return flat
+    # dates and numbers back to strings, as in the flat parser; nested values stay JSON-serialisable
+    return json.loads(json.dumps(data, default=str))
+
+
+class FrontMatterIndex:
+    def __init__(self, directory, cache_path=None, pattern: str = "*.md"):
+        self.directory = Path(directory)
+        name = self.directory.resolve().name
+        self.cache_path = Path(cache_path) if cache_path else CACHE_DIR / f"{name}.json"
+        self.pattern = pattern
+        self.stats = {"cached": 0, "read": 0, "removed": 0}
+        old = {}
+        if self.cache_path.exists():
+            try:
+                old = json.loads(self.cache_path.read_text(encoding="utf-8")).get("files") or {}
+            except ValueError:
+                old = {}
+        self.files = self._scan(old)
+        if self.stats["read"] or self.stats["removed"]:
+            self.save()
+
+    def _scan(self, old: Dict) -> Dict:
+        files = {}
+        for path in sorted(self.directory.glob(self.pattern)):
+            st = path.stat()
+            prev = old.get(path.name)
+            if prev and prev["mtime_ns"] == st.st_mtime_ns and prev["size"] == st.st_size:
+                files[path.name] = prev
+                self.stats["cached"] += 1
+                continue
+            header = read_header(path)
+            files[path.name] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size,
+                                "fields": parse_header(header) if header is not None else {}}
+            self.stats["read"] += 1
+        self.stats["removed"] = len(set(old) - set(files))
+        return files
+
+    def save(self) -> None:
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_path.write_text(json.dumps({"files": self.files}, ensure_ascii=False, separators=(",", ":")),
+                                   encoding="utf-8")
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        """(filename, fields) for every file, in filename order."""
+        for name, e in self.files.items():
+            yield name, e["fields"]
+
+    def get(self, filename: str) -> Dict:
+        e = self.files.get(filename)
+        return e["fields"] if e else {}
+
+    def field(self, key: str) -> Dict[str, str]:
+        """{filename: value} for the files whose front matter sets `key` to a non-empty value."""
+        return {name: e["fields"][key] for name, e in self.files.items() if e["fields"].get(key)}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        sys.exit("usage: frontmatter.py COLLECTION_DIR [FIELD]")
+    index = FrontMatterIndex(sys.argv[1])
+    out = index.field(sys.argv[2]) if len(sys.argv) == 3 else dict(index.items())
+    print(json.dumps(out, ensure_ascii=False, indent=1))
+    print(f"{len(index)} files: {index.stats['cached']} cached, {index.stats['read']} read", file=sys.stderr)
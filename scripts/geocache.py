@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent geocoding cache for talkmap.py.
+
+- Keyed by the normalized location string (whitespace collapsed, case-folded), so
+  "Berkeley CA, USA" and "berkeley  ca, usa" cost one lookup.
+- Failed lookups are cached too ("negative" entries), for a shorter time.
+- Entries expire after `ttl_days` (found) / `negative_ttl_days` (not found).
+- resolve() deduplicates all requested locations first, then sends only the misses,
+  one at a time, through a rate-limited queue (Nominatim allows 1 request/second).
+- The geocoder backend is pluggable: anything with geocode(query) -> Place or None.
+  NominatimBackend wraps geopy; OfflineBackend answers from a JSON table, for tests
+  and offline runs.
+"""
+import json
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, Iterable, NamedTuple, Optional
+
+
+class Place(NamedTuple):
+    # the attributes getorg and the map output read from a geopy Location
+    address: str
+    latitude: float
+    longitude: float
+
+
+def normalize(location: str) -> str:
+    return " ".join((location or "").split()).casefold()
+
+
+class NominatimBackend:
+    def __init__(self, user_agent: str = "academicpages-talkmap", timeout: float = 10):
+        from geopy import Nominatim
+        self._geocoder = Nominatim(user_agent=user_agent, timeout=timeout)
+
+    def geocode(self, query: str) -> Optional[Place]:
+        loc = self._geocoder.geocode(query)
+        if loc is None:
+            return None
+        return Place(loc.address, loc.latitude, loc.longitude)
+
+
+class OfflineBackend:
+    """Answers from a {location: [lat, lon]} JSON table; anything else is "not found"."""
+
+    def __init__(self, table_path: Path):
+        table = json.loads(Path(table_path).read_text(encoding="utf-8"))
+        self.table = {normalize(k): v for k, v in table.items()}
+
+    def geocode(self, query: str) -> Optional[Place]:
+        hit = self.table.get(normalize(query))
+        return Place(query, hit[0], hit[1]) if hit else None
+
+
+class GeocodeCache:
+    def __init__(self, path: Path, ttl_days: float = 365, negative_ttl_days: float = 30):
+        self.path = Path(path)
+        self.ttl = ttl_days * 86400
+        self.negative_ttl = negative_ttl_days * 86400
+        self.entries: Dict[str, Dict] = {}
+        if self.path.exists():
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+        self.stats = {"hit": 0, "miss": 0, "failed": 0}
+
+    def _fresh(self, e: Dict, now: float) -> bool:
+        return now - e["t"] < (self.ttl if e.get("lat") is not None else self.negative_ttl)
+
+    def resolve(self, locations: Iterable[str], backend, min_interval: float = 1.0,
+                refresh: bool = False, log: Callable[[str], None] = print) -> Dict[str, Optional[Place]]:
+        """{location: Place or None} for every given location, geocoding only cache misses."""
+        now = time.time()
+        locations = [loc for loc in locations if loc]
+        wanted: Dict[str, str] = {}   # normalized -> first spelling seen
+        for loc in locations:
+            wanted.setdefault(normalize(loc), loc)
+
+        queue = deque(k for k in wanted
+                      if refresh or k not in self.entries or not self._fresh(self.entries[k], now))
+        self.stats["hit"] += len(wanted) - len(queue)
+        last = 0.0
+        while queue:
+            key = queue.popleft()
+            wait = last + min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            last = time.monotonic()
+            self.stats["miss"] += 1
+            try:
+                place = backend.geocode(wanted[key])
+            except Exception as e:   # geopy raises several unrelated types; don't cache errors
+                self.stats["failed"] += 1
+                log(f"WARN: geocoding {wanted[key]!r} failed: {e}")
+                continue
+            self.entries[key] = {"query": wanted[key], "t": time.time(),
+                                 "address": place.address if place else None,
+                                 "lat": place.latitude if place else None,
+                                 "lon": place.longitude if place else None}
+
+        return {loc: self.lookup(loc) for loc in locations}
+
+    def lookup(self, location: str) -> Optional[Place]:
+        e = self.entries.get(normalize(location))
+        return Place(e["address"], e["lat"], e["lon"]) if e and e["lat"] is not None else None
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(self.entries, ensure_ascii=False, indent=1, sort_keys=True),
+                             encoding="utf-8")
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Write-ahead journal and atomic writes for update_publications_orcid.py.
+
+- Journal appends one JSON line per record as soon as the record is enriched. The file
+  (default _data/.cache/orcid_journal.jsonl) starts with a header line that identifies
+  the run, e.g. its ORCID iDs. Each line is flushed, so a killed job loses at most the
+  record being written. A torn last line is skipped on load.
+- When a run starts and the journal of an interrupted run with the same header exists,
+  its records are loaded and the run appends to it. The caller skips every DOI and
+  put-code found there. A journal with another header is discarded.
+- finish() deletes the journal once the final files have been written, so the next run
+  starts clean.
+- write_atomic() writes to a temporary file next to the target and os.replace()s it, so
+  an interrupted run leaves either the old file or the new one, never a truncated one.
+"""
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+
+def write_atomic(path: Path, text: str) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # mkstemp creates the file as 0600; keep the mode of the file being replaced
+    mode = path.stat().st_mode & 0o777 if path.exists() else 0o644
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class Journal:
+    """{key: record} entries of one run, keyed per `kind` ("doi", "detail", ...)."""
+
+    def __init__(self, path: Path, header: Dict):
+        self.path = Path(path)
+        self.header = header
+        self.entries: Dict[str, Dict[str, Dict]] = {}
+        self._torn = False
+        self.resumed = self._load()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._f = open(self.path, "a" if self.resumed else "w", encoding="utf-8")
+        if self._torn:
+            self._f.write("\n")   # the next entry must not be glued to the torn line
+        if not self.resumed:
+            self._write({"journal": header})
+
+    def _load(self) -> bool:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                text = f.read()
+        except (OSError, ValueError):
+            return False
+        lines = text.splitlines()
+        try:
+            if not lines or json.loads(lines[0]).get("journal") != self.header:
+                return False
+        except ValueError:
+            return False
+        for line in lines[1:]:
+            try:
+                e = json.loads(line)
+                self.entries.setdefault(e["kind"], {})[e["key"]] = e["record"]
+            except (ValueError, KeyError, TypeError):   # torn write of the interrupted run
+                continue
+        self._torn = not text.endswith("\n")
+        return True
+
+    def _write(self, obj: Dict) -> None:
+        self._f.write(json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._f.flush()
+
+    def get(self, kind: str, key: str) -> Optional[Dict]:
+        return (self.entries.get(kind) or {}).get(key)
+
+    def add(self, kind: str, key: str, record: Dict) -> None:
+        with self._lock:
+            self.entries.setdefault(kind, {})[key] = record
+            self._write({"kind": kind, "key": key, "record": record})
+
+    def finish(self) -> None:
+        """The run completed: drop the journal."""
+        self._f.close()
+        self.path.unlink()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental parsing of one large array inside a JSON response, standard library only.
+
+iter_array(chunks, key) yields the elements of the array under the top-level `key` of a
+JSON object while the body is still arriving (e.g. requests' iter_content()). Only one
+element (plus one network chunk) is held in memory at a time; each element is decoded
+with json's C decoder (JSONDecoder.raw_decode), so it is about as fast as json.loads.
+
+Other top-level values are decoded and dropped. Reading stops at the end of the array,
+so anything after it is not downloaded.
+"""
+import codecs
+import json
+from typing import Any, Iterable, Iterator, Union
+
+WHITESPACE = " \t\n\r"
+DELIMITERS = WHITESPACE + ",:]}"
+_decoder = json.JSONDecoder()
+
+
+class _Buffer:
+    def __init__(self, chunks: Iterable[Union[bytes, str]]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self) -> None:
+        for chunk in self._chunks:
+            chunk = self._utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if chunk:
+                if self.pos > 65536:   # drop what has been consumed
+                    self.text, self.pos = self.text[self.pos:], 0
+                self.text += chunk
+                return
+        self.text += self._utf8.decode(b"", final=True)
+        self.eof = True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ("" at the end of the input), not consumed."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text) or self.eof:
+                return self.text[self.pos:self.pos + 1]
+            self.more()
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at offset {self.pos}, got {self.peek()!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.more()
+                continue
+            # a number cut by the chunk boundary ("12" of "123", "-2." of "-2.5") decodes as a shorter
+            # number: accept it only once the character after it is known to end it
+            if not self.eof and (end == len(self.text) or self.text[end] not in DELIMITERS):
+                self.more()
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_array(chunks: Iterable[Union[bytes, str]], key: str) -> Iterator[Any]:
+    """Elements of the array at top-level `key` of the JSON object in `chunks`, one at a time.
+    Yields nothing if the key is missing or its value is null."""
+    buf = _Buffer(chunks)
+    buf.expect("{")
+    if buf.peek() == "}":
+        return
+    while True:
+        name = buf.value()
+        buf.expect(":")
+        if name == key and buf.peek() == "[":
+            buf.pos += 1
+            if buf.peek() == "]":
+                return
+            while True:
+                yield buf.value()
+                if buf.peek() == "]":
+                    return
+                buf.expect(",")
+        buf.value()
+        if buf.peek() == "}":
+            return
+        buf.expect(",")
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed marker clusters for talkmap.py, written as static JSON tiles.
+
+The getorg map hands every location to Leaflet.markercluster, which clusters in the browser
+on every load and zoom. Here the clusters are computed once, when the map is built:
+
+- Points are projected to Web Mercator "world" coordinates (0..1 on both axes).
+- Hierarchical greedy clustering, from MAX_ZOOM down to 0: at each zoom the clusters of the
+  zoom below (more detailed) are merged with every neighbour within RADIUS screen pixels,
+  found through a grid of RADIUS-sized cells. A merged cluster sits at the count-weighted
+  centroid and keeps the bounding box of its points.
+- The clusters of zoom z are grouped by tile: talkmap/clusters/{z}/{x}/{y}.js, where x/y
+  is the Web Mercator tile at zoom max(0, z - TILE_SHIFT), so each file covers 8x8 map tiles
+  and a view needs at most four of them.
+  Every tile holds a JSON array of [lat, lon, "location"] (a single point) or
+  [lat, lon, count, south, west, north, east] (a cluster); at MAX_ZOOM a cluster also
+  carries the list of its locations.
+- talkmap/clusters/index.js lists the existing tiles of each zoom, so the page requests
+  only the tiles that overlap the view and never asks for an empty one. Zooms past the
+  first one where nothing merges any more are not written; the page reuses that one.
+- The files are scripts that hand their JSON to a callback (talkmapIndex(...) and
+  talkmapTile("z/x/y", ...)) and map.html loads them with <script> tags rather than fetch(),
+  so the map also works when map.html is opened from disk (file://), like the getorg one.
+
+No network access and no third-party package is needed: the same points always give the
+same files.
+"""
+import json
+import math
+import shutil
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+MAX_ZOOM = 16      # deepest zoom with its own clusters; the page reuses it beyond that
+RADIUS = 60        # cluster radius in screen pixels
+TILE_SIZE = 256
+TILE_SHIFT = 3     # a data tile at zoom z is a map tile of zoom z - 3 (8x8 map tiles, 2048 px)
+MAX_LAT = 85.05112878
+
+
+class Cluster(NamedTuple):
+    x: float
+    y: float
+    count: int
+    bbox: Tuple[float, float, float, float]   # south, west, north, east
+    labels: Tuple[str, ...]                   # the locations in the cluster
+
+
+def project(lat: float, lon: float) -> Tuple[float, float]:
+    """Web Mercator world coordinates in [0, 1]."""
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    s = math.sin(math.radians(lat))
+    return (lon + 180) / 360, 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+
+
+def unproject(x: float, y: float) -> Tuple[float, float]:
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return lat, x * 360 - 180
+
+
+def _merge(members: List[Cluster]) -> Cluster:
+    if len(members) == 1:
+        return members[0]
+    count = sum(c.count for c in members)
+    x = sum(c.x * c.count for c in members) / count
+    y = sum(c.y * c.count for c in members) / count
+    bbox = (min(c.bbox[0] for c in members), min(c.bbox[1] for c in members),
+            max(c.bbox[2] for c in members), max(c.bbox[3] for c in members))
+    return Cluster(x, y, count, bbox, sum((c.labels for c in members), ()))
+
+
+def cluster_zoom(items: List[Cluster], zoom: int, radius: float = RADIUS) -> List[Cluster]:
+    """Greedy merge of `items` at `zoom`: each unmerged item absorbs the unmerged items within radius px."""
+    r = radius / (TILE_SIZE * 2 ** zoom)
+    grid: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for i, c in enumerate(items):
+        grid[int(c.x / r), int(c.y / r)].append(i)
+    used = [False] * len(items)
+    out = []
+    for i, c in enumerate(items):
+        if used[i]:
+            continue
+        used[i] = True
+        members = [c]
+        cx, cy = int(c.x / r), int(c.y / r)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in grid.get((cx + dx, cy + dy), ()):
+                    if not used[j] and (items[j].x - c.x) ** 2 + (items[j].y - c.y) ** 2 <= r * r:
+                        used[j] = True
+                        members.append(items[j])
+        out.append(_merge(members))
+    return out
+
+
+def build_levels(points: Dict[str, Tuple[float, float]], max_zoom: int = MAX_ZOOM,
+                 radius: float = RADIUS) -> List[List[Cluster]]:
+    """Clusters for every zoom 0..max_zoom of {location: (lat, lon)}."""
+    items = []
+    for label in sorted(points):
+        lat, lon = points[label]
+        x, y = project(lat, lon)
+        items.append(Cluster(x, y, 1, (lat, lon, lat, lon), (label,)))
+    levels = [items]
+    for zoom in range(max_zoom, -1, -1):
+        levels.append(cluster_zoom(levels[-1], zoom, radius))
+    # levels[k + 1] belongs to zoom max_zoom - k
+    return levels[:0:-1]
+
+
+def _encode(c: Cluster, deepest: bool) -> list:
+    lat, lon = unproject(c.x, c.y)
+    if c.count == 1:
+        return [round(lat, 5), round(lon, 5), c.labels[0]]
+    out = [round(lat, 5), round(lon, 5), c.count] + [round(v, 5) for v in c.bbox]
+    # places too close to ever split: the page lists them instead of zooming further
+    return out + [list(c.labels)] if deepest else out
+
+
+def _json(data) -> str:
+    # "</" cannot end the script early; a JSON string never needs the raw sequence
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+
+
+def write_tiles(points: Dict[str, Tuple[float, float]], out_dir: Path, max_zoom: int = MAX_ZOOM,
+                radius: float = RADIUS) -> Dict:
+    """Replace out_dir with the cluster tiles and index.js of `points`; returns the index."""
+    out_dir = Path(out_dir)
+    if out_dir.exists():
+        shutil.rmtree(out_dir)   # tiles of locations that are gone must not linger
+    levels = build_levels(points, max_zoom, radius)
+    # zooms deeper than the first one that matches the deepest level would repeat it
+    max_zoom = next(z for z, clusters in enumerate(levels) if len(clusters) == len(levels[-1]))
+    index = {"max_zoom": max_zoom, "tile_shift": TILE_SHIFT, "radius": radius, "points": len(points),
+             "tiles": {}}
+    for zoom, clusters in enumerate(levels[:max_zoom + 1]):
+        n = 2 ** max(0, zoom - TILE_SHIFT)
+        tiles: Dict[Tuple[int, int], list] = defaultdict(list)
+        for c in clusters:
+            tiles[min(n - 1, int(c.x * n)), min(n - 1, int(c.y * n))].append(_encode(c, zoom == max_zoom))
+        for (tx, ty), data in sorted(tiles.items()):
+            path = out_dir / str(zoom) / str(tx) / f"{ty}.js"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f'talkmapTile("{zoom}/{tx}/{ty}",{_json(data)});\n', encoding="utf-8")
+        index["tiles"][str(zoom)] = [f"{tx}/{ty}" for tx, ty in sorted(tiles)]
+    (out_dir / "index.js").write_text(f"talkmapIndex({_json(index)});\n", encoding="utf-8")
+    return index
+
+
+MAP_HTML = """<!DOCTYPE html>
+<html>
+<head>
+  <title>Talk map</title>
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/leaflet/1.9.4/leaflet.css" />
+  <script src="https://cdnjs.cloudflare.com/ajax/libs/leaflet/1.9.4/leaflet.js"></script>
+  <link rel="stylesheet" href="leaflet_dist/screen.css" />
+  <link rel="stylesheet" href="leaflet_dist/MarkerCluster.css" />
+  <link rel="stylesheet" href="leaflet_dist/MarkerCluster.Default.css" />
+</head>
+<body>
+  <div id="map"></div>
+  <span>Click a cluster to zoom to its talks</span>
+  <script type="text/javascript">
+    // clusters are precomputed per zoom by talkmap.py (scripts/mapclusters.py); only the
+    // tiles overlapping the view are loaded, as <script>s so that file:// works too
+    var tiles = L.tileLayer('https://server.arcgisonline.com/ArcGIS/rest/services/World_Street_Map/MapServer/tile/{z}/{y}/{x}', {
+      maxZoom: 18,
+      attribution: 'Tiles &copy; Esri &mdash; Source: Esri, DeLorme, NAVTEQ, USGS, Intermap, iPC, NRCAN, Esri Japan, METI, Esri China (Hong Kong), Esri (Thailand), TomTom, 2012'
+    });
+    var map = L.map('map', {center: L.latLng(30, 10), zoom: 1, layers: [tiles]});
+    var shown = L.layerGroup().addTo(map);
+    var loaded = {};
+
+    function marker(a) {
+      if (typeof a[2] === 'string') {
+        return L.marker([a[0], a[1]], {title: a[2]}).bindPopup(a[2]);
+      }
+      var size = a[2] < 10 ? 'small' : a[2] < 100 ? 'medium' : 'large';
+      var m = L.marker([a[0], a[1]], {icon: L.divIcon({
+        html: '<div><span>' + a[2] + '</span></div>',
+        className: 'marker-cluster marker-cluster-' + size,
+        iconSize: L.point(40, 40)
+      })});
+      if (a[7]) return m.bindPopup(a[7].join('<br>'));
+      return m.on('click', function () {
+        map.fitBounds([[a[3], a[4]], [a[5], a[6]]], {padding: [40, 40], maxZoom: map.getZoom() + 2});
+      });
+    }
+
+    var pending = {};
+    function talkmapTile(key, data) {
+      if (pending[key]) pending[key](data);
+    }
+    function loadTile(key) {
+      return new Promise(function (resolve, reject) {
+        pending[key] = resolve;
+        var s = document.createElement('script');
+        s.src = 'clusters/' + key + '.js';
+        s.onerror = reject;
+        document.head.appendChild(s);
+      });
+    }
+
+    function talkmapIndex(index) {
+      function refresh() {
+        var z = Math.max(0, Math.min(index.max_zoom, Math.round(map.getZoom())));
+        var tz = Math.max(0, z - index.tile_shift), n = Math.pow(2, tz);
+        var have = {};
+        index.tiles[z].forEach(function (t) { have[t] = true; });
+        var b = map.getBounds();
+        var nw = map.project(b.getNorthWest(), tz).divideBy(256).floor();
+        var se = map.project(b.getSouthEast(), tz).divideBy(256).floor();
+        var wanted = [];
+        for (var x = Math.max(0, nw.x); x <= Math.min(n - 1, se.x); x++) {
+          for (var y = Math.max(0, nw.y); y <= Math.min(n - 1, se.y); y++) {
+            if (have[x + '/' + y]) wanted.push(z + '/' + x + '/' + y);
+          }
+        }
+        Promise.all(wanted.map(function (key) {
+          if (!loaded[key]) {
+            loaded[key] = loadTile(key);
+          }
+          return loaded[key];
+        })).then(function (parts) {
+          if (Math.max(0, Math.min(index.max_zoom, Math.round(map.getZoom()))) !== z) return;
+          shown.clearLayers();
+          parts.forEach(function (part) { part.forEach(function (a) { shown.addLayer(marker(a)); }); });
+        });
+      }
+      map.on('moveend', refresh);
+      refresh();
+    }
+  </script>
+  <script src="clusters/index.js"></script>
+</body>
+</html>
+"""
+
+
+def write_map(points: Dict[str, Tuple[float, float]], folder: Path, max_zoom: int = MAX_ZOOM,
+              radius: float = RADIUS) -> Dict:
+    """talkmap/map.html plus its cluster tiles in talkmap/clusters/."""
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    index = write_tiles(points, folder / "clusters", max_zoom, radius)
+    (folder / "map.html").write_text(MAP_HTML, encoding="utf-8")
+    return index
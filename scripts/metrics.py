@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in timing, counter, HTTP and memory instrumentation shared by the updater and the
+markdown generators.
+
+  --metrics FILE : write a JSON summary to FILE when the script finishes:
+                   wall time per phase, counters (cache hits, skipped records, ...),
+                   per-host request count / p50 / p95 latency / retries / bytes / status
+                   codes, and the tracemalloc peak. tracemalloc slows Python code down
+                   noticeably, so absolute timings are a little pessimistic.
+  --profile FILE : run the script under cProfile and dump the stats to FILE
+                   (read with `python -m pstats FILE`).
+
+Without either option every call below is a cheap no-op.
+
+    metrics = Metrics("talks", args.metrics, args.profile)
+    with metrics.phase("render"):     # accumulates, so it can be used inside a loop
+        ...
+    for row in metrics.timed("read", rows):   # time spent producing each item of a generator
+        ...
+    metrics.count("skipped_cutoff")
+    metrics.request("api.crossref.org", 0.21, 5120, 200)
+    metrics.finish()
+"""
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from typing import Dict, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# cProfile, tracemalloc and json are imported only when requested: the generators start in well
+# under 100 ms and this module is imported on every run
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--metrics", metavar="FILE", help="write a JSON timing/metrics summary to FILE")
+    parser.add_argument("--profile", metavar="FILE", help="dump cProfile stats to FILE")
+
+
+def metrics_from_args(script: str) -> "Metrics":
+    """Metrics for --metrics / --profile on the command line (unknown arguments are ignored)."""
+    parser = argparse.ArgumentParser(add_help=False)
+    add_arguments(parser)
+    args = parser.parse_known_args()[0]
+    return Metrics(script, args.metrics, args.profile)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class _Phase:
+    __slots__ = ("metrics", "name", "t0")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.metrics.add_time(self.name, time.perf_counter() - self.t0)
+
+
+class Metrics:
+    def __init__(self, script: str, path: Optional[str] = None, profile: Optional[str] = None):
+        self.script = script
+        self.path = str(path) if path else None
+        self.profile_path = str(profile) if profile else None
+        self.enabled = bool(path or profile)
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.counters: Counter = Counter()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.hosts: Dict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self._profiler = None
+        if self.path:
+            import tracemalloc
+            tracemalloc.start()
+        if self.profile_path:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def phase(self, name: str):
+        return _Phase(self, name) if self.enabled else nullcontext()
+
+    def timed(self, name: str, items: Iterable[T]) -> Iterator[T]:
+        """`items`, with the time spent producing each one added to phase `name`. For lazy
+        readers, where a phase around the call that creates the generator would measure nothing."""
+        if not self.enabled:
+            yield from items
+            return
+        it = iter(items)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                self.add_time(name, time.perf_counter() - t0)
+                return
+            self.add_time(name, time.perf_counter() - t0)
+            yield item
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[name] += seconds
+
+    def count(self, name: str, n: float = 1) -> None:
+        if self.enabled:
+            with self._lock:
+                self.counters[name] += n
+
+    def request(self, host: str, seconds: float, nbytes: int, status: int) -> None:
+        if self.enabled:
+            with self._lock:
+                self.latencies[host].append(seconds)
+                self.hosts[host]["bytes"] += nbytes
+                self.hosts[host][f"status_{status}"] += 1
+
+    def retry(self, host: str) -> None:
+        if self.enabled:
+            with self._lock:
+                self.hosts[host]["retries"] += 1
+
+    def summary(self) -> Dict:
+        import platform
+        import tracemalloc
+        hosts = {}
+        for host, lat in self.latencies.items():
+            c = self.hosts[host]
+            hosts[host] = {
+                "requests": len(lat),
+                "p50_ms": round(percentile(lat, 50) * 1000, 2),
+                "p95_ms": round(percentile(lat, 95) * 1000, 2),
+                "retries": c["retries"],
+                "bytes": c["bytes"],
+                "status": {k[7:]: v for k, v in sorted(c.items()) if k.startswith("status_")},
+            }
+        out = {
+            "script": self.script,
+            "python": platform.python_version(),
+            "wall_seconds": round(time.perf_counter() - self._t0, 4),
+            "phases": {k: round(v, 4) for k, v in self.phases.items()},
+            "counters": {k: round(v, 4) if isinstance(v, float) else v for k, v in sorted(self.counters.items())},
+            "hosts": hosts,
+        }
+        if tracemalloc.is_tracing():
+            out["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+        return out
+
+    def finish(self) -> None:
+        """Stop profiling and write the --metrics / --profile files, if requested."""
+        if self._profiler:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile_path)
+            print(f"profile written to {self.profile_path}", file=sys.stderr)
+        if self.path:
+            import json
+            import tracemalloc
+            summary = self.summary()
+            tracemalloc.stop()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=1)
+            print(f"metrics written to {self.path}", file=sys.stderr)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+OpenAlex source for update_publications_orcid.py (--source openalex), and cross-filling of
+missing fields between the ORCID and OpenAlex outputs.
+
+- One /works?filter=author.orcid:...,from_publication_date:... query per run, paged with
+  cursor=* and per-page=200 (OpenAlex's maximum), with select= limited to the fields mapped
+  below. A 500-work profile takes 3 requests instead of ORCID plus a Crossref lookup per DOI.
+- Several ORCID iDs go into one filter (author.orcid:a|b), and a work they share comes back once.
+- Records have the shape of the ORCID/Crossref ones, which _data/pubs_openalex.json already
+  used: title, authors ("First Last, ..."), venue, doi, publication_date.
+- cross_fill() fills empty fields of one record list from the other, matched by DOI or else
+  by normalized title (pubstore.normalize_title); fields that have a value are never replaced,
+  except the placeholder "YYYY-01-01" date of a record the updater flagged as a title-only
+  fallback (FALLBACK), which the match's date replaces.
+"""
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from crossref_cache import canon_doi
+from pubstore import normalize_title
+
+PER_PAGE = 200
+SELECT = "id,doi,display_name,publication_date,primary_location,authorships"
+FIELDS = ("title", "authors", "venue", "doi", "publication_date")
+# set by update_publications_orcid.py on title + year records Crossref could not enrich; never saved
+FALLBACK = "_fallback"
+
+
+def openalex_works(get: Callable, api: str, orcids: List[str], since_year: int,
+                   mailto: str = "") -> Iterator[Dict]:
+    """Every OpenAlex work of the given ORCID iDs published in or after since_year.
+
+    get(url, params=...) returns a requests.Response; the updater passes its paced, retrying get().
+    """
+    params = {
+        "filter": f"author.orcid:{'|'.join(orcids)},from_publication_date:{since_year}-01-01",
+        "select": SELECT,
+        "per-page": PER_PAGE,
+        "cursor": "*",
+    }
+    if mailto:
+        params["mailto"] = mailto   # OpenAlex's polite pool
+    while params["cursor"]:
+        r = get(f"{api}/works", params=params)
+        r.raise_for_status()
+        data = r.json() or {}
+        results = data.get("results") or []
+        yield from results
+        params["cursor"] = (data.get("meta") or {}).get("next_cursor") if results else None
+
+
+def openalex_record(w: Dict) -> Dict:
+    """Output record from one OpenAlex work."""
+    source = ((w.get("primary_location") or {}).get("source") or {})
+    authors = [((a.get("author") or {}).get("display_name") or "").strip() for a in w.get("authorships") or []]
+    return {
+        "title": (w.get("display_name") or "").strip() or None,
+        "authors": ", ".join(a for a in authors if a) or None,
+        "venue": (source.get("display_name") or "").strip() or None,
+        "doi": canon_doi(w.get("doi") or ""),
+        "publication_date": w.get("publication_date") or None,
+    }
+
+
+def _key(rec: Dict) -> Tuple[str, str]:
+    return (rec.get("doi") or "").lower(), normalize_title(rec.get("title") or "")
+
+
+def cross_fill(records: List[Dict], others: List[Dict]) -> int:
+    """Fill empty fields of `records` in place from matching `others`; returns the number of fields filled."""
+    by_doi, by_title = {}, {}
+    for o in others:
+        doi, title = _key(o)
+        if doi:
+            by_doi.setdefault(doi, o)
+        if title:
+            by_title.setdefault(title, o)
+    filled = 0
+    for rec in records:
+        doi, title = _key(rec)
+        match = by_doi.get(doi) if doi else None
+        if match is None and title:
+            match = by_title.get(title)
+            # a title match with a different DOI is another version (preprint vs article)
+            if match is not None and doi and match.get("doi") and match["doi"].lower() != doi:
+                match = None
+        if match is None:
+            continue
+        for k in FIELDS:
+            if not rec.get(k) and match.get(k):
+                rec[k] = match[k]
+                filled += 1
+        date = rec.get("publication_date") or ""
+        if rec.get(FALLBACK) and date.endswith("-01-01") and match.get("publication_date") \
+                and match["publication_date"] != date:
+            rec["publication_date"] = match["publication_date"]
+            filled += 1
+    return filled
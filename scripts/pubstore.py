@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+One local store for every publication source the site has, with cross-source dedup.
+
+Sources (each optional; missing files are skipped):
+  orcid    : _data/pubs_orcid.json            (update_publications_orcid.py)
+  openalex : _data/pubs_openalex.json
+  bib      : markdown_generator/*.bib         (the pubsFromBib.py inputs; needs pybtex)
+  tsv      : markdown_generator/publications.tsv
+
+Records live in SQLite (default _data/.cache/pubstore.sqlite). Re-ingesting a source
+replaces its rows; unchanged titles keep their stored MinHash bands, so only new or
+retitled records are hashed. A source that is skipped (no input, or pybtex missing)
+has its stored rows deleted, so it is neither clustered nor exported.
+
+Dedup, all sub-quadratic:
+  1. records with the same canon_doi() are the same publication;
+  2. near-duplicate titles: a MinHash signature (BANDS x ROWS) over the word unigrams
+     and bigrams of the normalized title is split into bands; records sharing a band
+     bucket are candidates and are merged when their shingle Jaccard similarity is at
+     least --threshold (default 0.8).
+  Two records with different DOIs are never merged (a preprint and its journal
+  version stay separate, as ORCID lists them).
+
+Export, in the shapes the site already uses:
+  --export-json FILE : [{title, authors, venue, doi, publication_date}] newest first,
+                       one per publication, like _data/pubs_orcid.json
+  --export-md DIR    : one _publications-style .md per publication (markdown_generator/render.py);
+                       unchanged files are skipped through a manifest of its own,
+                       _data/.cache/pubstore_manifest.json, kept per export directory;
+                       --prune deletes the files of publications no longer exported
+
+  python scripts/pubstore.py --export-json _data/pubs_all.json
+  python scripts/pubstore.py --bib markdown_generator/pubs.bib --export-md _publications
+"""
+import argparse
+import csv
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import sys
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from crossref_cache import canon_doi
+
+ROOT = Path(__file__).resolve().parent.parent
+GENERATOR_DIR = ROOT / "markdown_generator"
+MANIFEST = ROOT / "_data" / ".cache" / "pubstore_manifest.json"
+FIELDS = ("title", "authors", "venue", "doi", "publication_date")
+# merged fields are taken from the first source that has them
+SOURCE_PRIORITY = ("orcid", "openalex", "bib", "tsv")
+
+BANDS, ROWS = 8, 4
+_MASK = (1 << 64) - 1
+_rng = random.Random(20240217)
+# one (xor mask, odd multiplier) pair per MinHash function; fixed, so stored bands stay valid
+PERMS = [(_rng.getrandbits(64), _rng.getrandbits(64) | 1) for _ in range(BANDS * ROWS)]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    source_key TEXT NOT NULL,
+    title TEXT, authors TEXT, venue TEXT, doi TEXT, publication_date TEXT,
+    norm_title TEXT NOT NULL,
+    cluster INTEGER,
+    UNIQUE (source, source_key)
+);
+CREATE INDEX IF NOT EXISTS records_doi ON records (doi);
+CREATE TABLE IF NOT EXISTS lsh (
+    record_id INTEGER NOT NULL REFERENCES records (id) ON DELETE CASCADE,
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lsh_bucket ON lsh (band, bucket);
+CREATE INDEX IF NOT EXISTS lsh_record ON lsh (record_id);
+"""
+
+
+# ---------- title similarity ----------
+
+def normalize_title(title: str) -> str:
+    """Lowercase ASCII words: accents, bibtex braces, punctuation and spacing differences removed."""
+    text = unicodedata.normalize("NFKD", title or "").encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def shingles(norm_title: str) -> Set[str]:
+    words = norm_title.split()
+    return set(words) | {a + " " + b for a, b in zip(words, words[1:])}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def _hash64(data: bytes) -> int:
+    # stable across processes and Python versions, unlike hash(); stored bands depend on it
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def lsh_buckets(norm_title: str) -> List[int]:
+    """One bucket id per band of the title's MinHash signature."""
+    hashes = [_hash64(s.encode()) for s in shingles(norm_title)] or [0]
+    sig = [min(((h ^ x) * m) & _MASK for h in hashes) for x, m in PERMS]
+    return [_hash64(b"".join(v.to_bytes(8, "little") for v in sig[b * ROWS:(b + 1) * ROWS])) >> 1
+            for b in range(BANDS)]
+
+
+# ---------- sources ----------
+
+def _record(title, authors, venue, doi, date) -> Dict:
+    return {"title": (title or "").strip() or None, "authors": authors or None, "venue": venue or None,
+            "doi": canon_doi(doi or "").lower(), "publication_date": date or None}
+
+
+def read_json_source(path: Path) -> Iterator[Dict]:
+    for r in json.loads(path.read_text(encoding="utf-8")):
+        yield _record(r.get("title"), r.get("authors"), r.get("venue"), r.get("doi"), r.get("publication_date"))
+
+
+MONTHS = "jan feb mar apr may jun jul aug sep oct nov dec".split()
+
+
+def _strip_braces(text: Optional[str]) -> str:
+    return (text or "").replace("{", "").replace("}", "").replace("\\", "")
+
+
+def read_bib_source(path: Path) -> Iterator[Dict]:
+    from pybtex.database.input import bibtex
+    for entry in bibtex.Parser().parse_file(str(path)).entries.values():
+        f = entry.fields
+        authors = ", ".join(" ".join(p.first_names + p.last_names) for p in entry.persons.get("author", []))
+        date = None
+        if f.get("year"):
+            month = f.get("month", "").strip().lower()
+            month = int(month) if month.isdigit() else MONTHS.index(month[:3]) + 1 if month[:3] in MONTHS else 1
+            date = f"{f['year']}-{month:02d}-01"
+        venue = f.get("journal") or f.get("booktitle")
+        yield _record(_strip_braces(f.get("title")), authors, _strip_braces(venue), f.get("doi"), date)
+
+
+def read_tsv_source(path: Path) -> Iterator[Dict]:
+    with open(path, newline="", encoding="utf-8") as fh:
+        for row in csv.DictReader(fh, delimiter="\t"):
+            yield _record(row.get("title"), None, row.get("venue"), row.get("doi"), row.get("pub_date"))
+
+
+# ---------- store ----------
+
+class PubStore:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def ingest(self, source: str, records: Iterable[Dict]) -> Tuple[int, int]:
+        """Replace `source`'s records; returns (records, titles hashed)."""
+        old = {key: (rid, norm) for rid, key, norm in
+               self.db.execute("SELECT id, source_key, norm_title FROM records WHERE source = ?", (source,))}
+        seen, hashed = set(), 0
+        with self.db:
+            for rec in records:
+                if not rec["title"] and not rec["doi"]:
+                    continue
+                norm = normalize_title(rec["title"])
+                key = rec["doi"] or "title:" + norm
+                if key in seen:
+                    continue
+                seen.add(key)
+                values = [rec[f] for f in FIELDS]
+                if key in old:
+                    rid, old_norm = old[key]
+                    self.db.execute("UPDATE records SET title=?, authors=?, venue=?, doi=?, publication_date=?, "
+                                    "norm_title=? WHERE id=?", values + [norm, rid])
+                    if old_norm == norm:
+                        continue
+                    self.db.execute("DELETE FROM lsh WHERE record_id = ?", (rid,))
+                else:
+                    rid = self.db.execute("INSERT INTO records (source, source_key, title, authors, venue, doi, "
+                                          "publication_date, norm_title) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                          [source, key] + values + [norm]).lastrowid
+                if norm:
+                    hashed += 1
+                    self.db.executemany("INSERT INTO lsh (record_id, band, bucket) VALUES (?, ?, ?)",
+                                        [(rid, b, bucket) for b, bucket in enumerate(lsh_buckets(norm))])
+            gone = [(old[k][0],) for k in set(old) - seen]
+            self.db.executemany("DELETE FROM records WHERE id = ?", gone)
+        return len(seen), hashed
+
+    def drop(self, source: str) -> int:
+        """Delete every record of `source`; returns how many there were."""
+        with self.db:
+            return self.db.execute("DELETE FROM records WHERE source = ?", (source,)).rowcount
+
+    def cluster(self, threshold: float = 0.8) -> Dict[str, int]:
+        """Assign every record a cluster (= publication) id; returns merge counts."""
+        rows = {rid: (doi, norm) for rid, doi, norm in self.db.execute("SELECT id, doi, norm_title FROM records")}
+        parent = {rid: rid for rid in rows}
+        doi_of = {rid: doi for rid, (doi, _) in rows.items()}
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        def union(a, b) -> bool:
+            ra, rb = find(a), find(b)
+            if ra == rb or (doi_of[ra] and doi_of[rb] and doi_of[ra] != doi_of[rb]):
+                return False
+            parent[rb] = ra
+            doi_of[ra] = doi_of[ra] or doi_of[rb]
+            return True
+
+        stats = {"doi": 0, "title": 0, "candidates": 0}
+        by_doi: Dict[str, int] = {}
+        for rid, (doi, _) in rows.items():
+            if doi:
+                if doi in by_doi:
+                    stats["doi"] += union(by_doi[doi], rid)
+                else:
+                    by_doi[doi] = rid
+
+        shingle_cache: Dict[int, Set[str]] = {}
+        buckets = self.db.execute("SELECT group_concat(record_id) FROM lsh GROUP BY band, bucket HAVING count(*) > 1")
+        for (ids,) in buckets:
+            ids = [int(i) for i in ids.split(",")]
+            for i, a in enumerate(ids):
+                for b in ids[i + 1:]:
+                    if find(a) == find(b):
+                        continue
+                    stats["candidates"] += 1
+                    sa = shingle_cache.get(a) or shingle_cache.setdefault(a, shingles(rows[a][1]))
+                    sb = shingle_cache.get(b) or shingle_cache.setdefault(b, shingles(rows[b][1]))
+                    if jaccard(sa, sb) >= threshold:
+                        stats["title"] += union(a, b)
+
+        with self.db:
+            self.db.executemany("UPDATE records SET cluster = ? WHERE id = ?", [(find(r), r) for r in rows])
+        stats["records"] = len(rows)
+        stats["publications"] = len({find(r) for r in rows})
+        return stats
+
+    def publications(self) -> List[Dict]:
+        """One merged record per cluster, newest first."""
+        rank = {s: i for i, s in enumerate(SOURCE_PRIORITY)}
+        clusters: Dict[int, List[Tuple]] = {}
+        for row in self.db.execute("SELECT cluster, source, title, authors, venue, doi, publication_date "
+                                   "FROM records ORDER BY id"):
+            clusters.setdefault(row[0], []).append(row[1:])
+        out = []
+        for members in clusters.values():
+            members.sort(key=lambda m: rank.get(m[0], len(rank)))
+            rec = {}
+            for i, f in enumerate(FIELDS, start=1):
+                rec[f] = next((m[i] for m in members if m[i]), None)
+            rec["doi"] = rec["doi"] or ""
+            out.append(rec)
+        out.sort(key=lambda x: x.get("publication_date") or "", reverse=True)
+        return out
+
+
+def export_markdown(records: List[Dict], out_dir: Path, prune: bool = False) -> None:
+    """Write one .md per publication through render.py, skipping unchanged files (manifest.py)."""
+    sys.path.insert(0, str(GENERATOR_DIR))
+    from manifest import Manifest
+    from render import render_record
+
+    out_dir = out_dir.resolve()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    MANIFEST.parent.mkdir(parents=True, exist_ok=True)
+    # not the generators' .manifest.json: keys are absolute, so the same directory gets the same
+    # entries from any working directory, and each export directory has its own orphans
+    try:
+        label = out_dir.relative_to(ROOT).as_posix()
+    except ValueError:
+        label = str(out_dir)
+    manifest = Manifest(f"pubstore:{label}", path=str(MANIFEST))
+    outputs: Dict[str, Tuple[str, str]] = {}
+    for rec in records:
+        if rec["title"]:
+            md_filename, md = render_record(rec)
+            if md_filename in outputs:
+                # as in pubsFromBib.py: the later record wins, but the collision is reported
+                print(f"WARNING {md_filename} is generated by more than one record: "
+                      f"{rec['doi'] or rec['title']!r} overwrites {outputs[md_filename][0]!r}")
+            outputs[md_filename] = (rec["doi"] or rec["title"], md)
+    for md_filename, (_, md) in outputs.items():
+        manifest.write(str(out_dir / md_filename), md, encoding="utf-8")
+    manifest.finish(prune)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Merge and deduplicate every publication source into one store.")
+    ap.add_argument("--db", type=Path, default=Path("_data/.cache/pubstore.sqlite"))
+    ap.add_argument("--orcid", type=Path, default=Path("_data/pubs_orcid.json"))
+    ap.add_argument("--openalex", type=Path, default=Path("_data/pubs_openalex.json"))
+    ap.add_argument("--bib", type=Path, nargs="*", help="bib files (default: markdown_generator/*.bib)")
+    ap.add_argument("--tsv", type=Path, default=GENERATOR_DIR / "publications.tsv")
+    ap.add_argument("--threshold", type=float, default=0.8, help="title Jaccard similarity to merge at")
+    ap.add_argument("--export-json", type=Path, metavar="FILE")
+    ap.add_argument("--export-md", type=Path, metavar="DIR")
+    ap.add_argument("--prune", action="store_true", help="delete .md files of DIR this script no longer exports")
+    args = ap.parse_args()
+
+    bibs = args.bib if args.bib is not None else sorted(GENERATOR_DIR.glob("*.bib"))
+    sources = [("orcid", [args.orcid], read_json_source), ("openalex", [args.openalex], read_json_source),
+               ("bib", bibs, read_bib_source), ("tsv", [args.tsv], read_tsv_source)]
+
+    store = PubStore(args.db)
+    for name, paths, reader in sources:
+        paths = [p for p in paths if p.exists()]
+        if not paths:
+            print(f"{name}: no input, skipped ({store.drop(name)} stored records dropped)")
+            continue
+        try:
+            records = [rec for p in paths for rec in reader(p)]
+        except ImportError as e:
+            print(f"{name}: {e}, skipped ({store.drop(name)} stored records dropped)")
+            continue
+        n, hashed = store.ingest(name, records)
+        print(f"{name}: {n} records ({hashed} titles hashed)")
+
+    stats = store.cluster(args.threshold)
+    print("pubstore: {records} records -> {publications} publications "
+          "({doi} merged by DOI, {title} by title of {candidates} candidate pairs)".format(**stats))
+    records = store.publications()
+    store.close()
+
+    if args.export_json:
+        args.export_json.parent.mkdir(parents=True, exist_ok=True)
+        args.export_json.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Saved {len(records)} records to {args.export_json}")
+    if args.export_md:
+        export_markdown(records, args.export_md, args.prune)
+
+
+if __name__ == "__main__":
+    main()
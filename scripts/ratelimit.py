@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive request pacing and retries for update_publications_orcid.py.
+
+- AdaptiveLimiter paces requests to one host with a token bucket and caps how many
+  are in flight. Both adapt AIMD-style: every successful response adds a little
+  rate and concurrency (up to the ceiling), every 429/5xx halves them.
+- The ceiling is the configured rate until the server advertises its own limit:
+  Crossref sends X-Rate-Limit-Limit / X-Rate-Limit-Interval (e.g. 50 / "1s") on
+  every response, and that becomes the ceiling.
+- Throttling responses that arrive together (one per in-flight request) count as one
+  congestion event: the rate is halved at most once per DECREASE_HOLDOFF seconds.
+- Retry-After (seconds or an HTTP date) pauses every request to that host, not just
+  the one that was throttled.
+- fetch() retries 429, 5xx and connection errors with jittered exponential backoff,
+  all retries together limited by one RetryBudget (seconds of backoff slept in the whole run;
+  time spent on requests does not count).
+  When a retry would overrun the budget, the last response is returned (or the last
+  error raised) and the caller handles it as before.
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+import requests
+
+RETRY_STATUS = frozenset([429, 500, 502, 503, 504])
+MIN_RATE = 0.2          # requests/sec floor after repeated throttling
+RATE_STEP = 0.5         # additive increase per successful response, requests/sec
+DECREASE_HOLDOFF = 1.0  # seconds between two multiplicative decreases
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+MAX_ATTEMPTS = 8
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests/sec, bursts of at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.waited = 0.0   # seconds slept in acquire(), summed over all waiting threads
+        self._tokens = capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+                self.waited += wait
+            time.sleep(wait)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date); None if absent/invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_interval(value: str) -> Optional[float]:
+    """X-Rate-Limit-Interval ("1s", "60s", "2m") in seconds."""
+    value = (value or "").strip().lower()
+    units = {"s": 1, "m": 60, "h": 3600}
+    try:
+        if value and value[-1] in units:
+            return float(value[:-1]) * units[value[-1]]
+        return float(value)
+    except ValueError:
+        return None
+
+
+class AdaptiveLimiter(TokenBucket):
+    """Token bucket plus an in-flight cap, both adjusted from the responses; use as a context manager
+    around each request. rate <= 0 means unpaced until the first throttling response."""
+
+    def __init__(self, rate: float, concurrency: int):
+        super().__init__(rate)
+        self.ceiling = rate
+        self.max_concurrency = max(1, concurrency)
+        self.concurrency = float(self.max_concurrency)
+        self.throttled = 0
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self._slots = threading.Condition()
+
+    def __enter__(self):
+        with self._slots:
+            while self._in_flight >= int(self.concurrency):
+                self._slots.wait()
+            self._in_flight += 1
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        with self._slots:
+            self._in_flight -= 1
+            self._slots.notify()
+
+    def on_success(self, headers) -> None:
+        limit, interval = headers.get("X-Rate-Limit-Limit"), parse_interval(headers.get("X-Rate-Limit-Interval"))
+        with self._lock:
+            if limit and interval:
+                try:
+                    self.ceiling = float(limit) / interval
+                except ValueError:
+                    pass
+            if self.rate > 0 and self.ceiling > 0:
+                self.rate = min(self.ceiling, self.rate + RATE_STEP)
+        with self._slots:
+            grown = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            if int(grown) > int(self.concurrency):
+                self._slots.notify()
+            self.concurrency = grown
+
+    def on_throttle(self, retry_after: Optional[float]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.throttled += 1
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            if now - self._last_decrease < DECREASE_HOLDOFF:
+                return
+            self._last_decrease = now
+            if self.rate <= 0:
+                # unpaced so far: start from one request per slot per second
+                self.rate = float(self.max_concurrency)
+            self.rate = max(MIN_RATE, self.rate / 2)
+        with self._slots:
+            self.concurrency = max(1.0, self.concurrency / 2)
+
+
+class RetryBudget:
+    """Total seconds that may be spent sleeping between retries, shared by all requests."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.spent = 0.0
+        self._lock = threading.Lock()
+
+    def take(self, delay: float) -> bool:
+        """Reserve `delay` seconds of backoff; False once that would overrun the budget."""
+        with self._lock:
+            if self.spent + delay > self.seconds:
+                return False
+            self.spent += delay
+            return True
+
+
+def fetch(session: requests.Session, url: str, limiter: AdaptiveLimiter, budget: RetryBudget,
+          on_retry: Optional[Callable[[str], None]] = None, **kwargs) -> requests.Response:
+    """session.get(url, **kwargs) paced by `limiter`, retrying throttling and transient failures."""
+    kwargs.setdefault("timeout", 60)
+    attempt = 0
+    while True:
+        error, r = None, None
+        with limiter:
+            try:
+                r = session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+        if r is not None and r.status_code not in RETRY_STATUS:
+            limiter.on_success(r.headers)
+            return r
+        retry_after = parse_retry_after(r.headers.get("Retry-After")) if r is not None else None
+        limiter.on_throttle(retry_after)
+        attempt += 1
+        delay = retry_after if retry_after is not None else \
+            random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+        if attempt >= MAX_ATTEMPTS or not budget.take(delay):
+            if r is not None:
+                return r
+            raise error
+        if r is not None:
+            r.close()   # releases the connection of a stream=True response
+        if on_retry:
+            on_retry(url)
+        time.sleep(delay)
@@ -6,30 +6,173 @@ Fetch your own works list strictly from ORCID, then enrich via Crossref by DOI.
 - Output: _data/pubs_orcid.json with [title, authors, venue, doi, publication_date].
 
 ENV:
-  ORCID    : e.g., 0000-0002-0278-502X
+  ORCID    : e.g., 0000-0002-0278-502X; several iDs separated by commas/spaces = group mode
   YEARS    : integer, default 5   (keeps items with year >= current_year - YEARS + 1)
   UA_EMAIL : optional, used in User-Agent for both ORCID & Crossref
+  CROSSREF_WORKERS : parallel Crossref lookups, default 4 (1 = serial)
+  CROSSREF_RPS     : starting Crossref request rate per second, default 5; adapted up to the
+                     rate Crossref advertises (X-Rate-Limit-*) and down on 429/5xx
+  ORCID_RPS        : starting ORCID request rate per second, default 8
+  RETRY_BUDGET     : total seconds all retries of throttled/failed requests may wait, default 300
+  CROSSREF_BATCH   : DOIs per /works?filter=doi:... request, default 20 (0 = one GET per DOI)
+  CACHE_TTL_DAYS   : Crossref cache entries older than this are revalidated, default 30
+  ORCID_API        : ORCID API base URL, default https://pub.orcid.org/v3.0
+  CROSSREF_API     : Crossref API base URL, default https://api.crossref.org
+  OPENALEX_API     : OpenAlex API base URL, default https://api.openalex.org
+                     (all three are overridden by benchmarks/standin.py)
+  OPENALEX_RPS     : OpenAlex request rate per second, default 10
+
+CLI:
+  --refresh    : ignore the Crossref cache and download every DOI again
+  --no-cache   : neither read nor write _data/.cache/crossref.sqlite
+  --full       : ignore the ORCID sync state and rebuild every record
+  --orcids-file FILE : read ORCID iDs from FILE (one per line, # comments), in addition to ORCID
+  --shards     : also write the list year by year, see below
+  --html       : also write the list as a ready-made HTML fragment, see below
+  --source openalex : build the list from OpenAlex instead, see below
+  --cross-fill : fill empty fields from the other source's last output, see below
+  --stream     : parse the ORCID /works response while it downloads (jsonstream.py): works
+                 before the cutoff are dropped as they arrive instead of after the whole body
+                 has been loaded, and Crossref batches start before the download finishes
+  --metrics FILE : write per-phase timings, per-host request stats, skip counts and peak
+                   memory as JSON to FILE; --profile FILE dumps cProfile stats (see metrics.py)
+
+Group mode (more than one iD): profiles are fetched concurrently, each DOI is enriched
+once however many members share it, every member gets _data/pubs_members/<orcid>.json
+and _data/pubs_orcid.json holds the merged, deduplicated group list. A member whose profile
+cannot be fetched (HTTP or network error) is skipped with a warning: its member file and sync
+state are kept, and its last records stay in the group list, while the others update.
+
+Incremental sync: _data/.cache/orcid_sync.json remembers each work's put-code and
+last-modified-date. Works whose summary is unchanged reuse their record from the
+previous output; only new or modified works are re-extracted and enriched.
+
+Checkpoint and resume: every record enriched from Crossref and every ORCID work detail is
+appended to _data/.cache/orcid_journal.jsonl as soon as it arrives (journal.py). If a run is
+killed (job timeout, network failure), the next run with the same ORCID iDs and YEARS resumes
+from the journal and skips those DOIs and put-codes. All output files are written atomically
+(temporary file + rename) and the journal is deleted once they are, so an interrupted run
+never leaves a truncated data file. A --refresh run discards the journal of a normal run (it
+only resumes an interrupted --refresh run). Delete the journal to start over.
+
+Works without a DOI cannot be enriched from Crossref. Their contributors, journal title
+and full publication date come from ORCID's bulk work endpoint instead,
+/v3.0/{orcid}/works/{put-code,put-code,...}, up to ORCID_BULK (100) works per request.
+
+Year shards (--shards): _data/pubs/<year>.json holds that year's records (undated ones go
+to undated.json) with display fields added: "year" and "authors_display". _data/pubs/index.json
+lists the shards newest first with their counts, so a page can loop over
+site.data.pubs.index.years and read only site.data.pubs[y.shard]. Only shards whose content
+changed are rewritten. _data/pubs_orcid.json is still written: the incremental sync reads it.
+
+HTML fragment (--html): _includes/publist.html holds the escaped <li> items of the list, and
+_data/publist.json names it together with the SHA-256 of its content. _pages/publications.md
+includes the fragment when that data file exists, so Jekyll no longer loops over the records.
+Both files are left untouched when the hash is unchanged.
+
+The page renders the first of: the HTML fragment, the year shards, _data/pubs_orcid.json. A run
+without --html (or --shards) deletes that output of an earlier run, so the page never renders a
+stale list; the weekly workflow uses --html only.
+
+Sources (--source): "orcid" (default) is the ORCID + Crossref pipeline above. "openalex" asks
+OpenAlex for every work of the same ORCID iDs in pages of 200 (see openalex.py) and writes
+_data/pubs_openalex.json in the same record shape. No Crossref, member files or sync state
+are involved, and --shards / --html are refused: their outputs are the ones
+_pages/publications.md renders, so they always come from the ORCID list. With --cross-fill,
+empty fields (authors, venue, date, ...) of the records are filled from the other source's
+output file, matched by DOI or normalized title, e.g. ORCID works Crossref does not know get
+their authors and venue from OpenAlex. The fill happens before anything is written, so the
+member files of group mode get the filled fields too.
 """
 import os
 import sys
 import json
-import time
+import html
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from crossref_cache import CrossrefCache, canon_doi, trim_message
+from journal import Journal, write_atomic
+from jsonstream import iter_array
+from metrics import Metrics, add_arguments
+from openalex import FALLBACK, cross_fill, openalex_record, openalex_works
+from ratelimit import AdaptiveLimiter, RetryBudget, fetch
 
-ORCID   = os.getenv("ORCID", "").strip()
+ORCID   = os.getenv("ORCID", "").replace(",", " ").split()
 YEARS   = int(os.getenv("YEARS", "5"))
 UA_EMAIL = os.getenv("UA_EMAIL", "").strip()
+WORKERS = max(1, int(os.getenv("CROSSREF_WORKERS", "4")))
+RPS     = float(os.getenv("CROSSREF_RPS", "5"))
+ORCID_RPS = float(os.getenv("ORCID_RPS", "8"))
+RETRY_BUDGET = float(os.getenv("RETRY_BUDGET", "300"))
+BATCH   = max(0, int(os.getenv("CROSSREF_BATCH", "20")))
+CACHE_TTL_DAYS = float(os.getenv("CACHE_TTL_DAYS", "30"))
+ORCID_BULK = 100   # put-codes per bulk work request, ORCID's maximum
+ORCID_API = os.getenv("ORCID_API", "https://pub.orcid.org/v3.0").rstrip("/")
+CROSSREF_API = os.getenv("CROSSREF_API", "https://api.crossref.org").rstrip("/")
+OPENALEX_API = os.getenv("OPENALEX_API", "https://api.openalex.org").rstrip("/")
+OPENALEX_RPS = float(os.getenv("OPENALEX_RPS", "10"))
+
+ap = argparse.ArgumentParser(description="Update _data/pubs_orcid.json from ORCID + Crossref "
+                                         "(or _data/pubs_openalex.json from OpenAlex).")
+ap.add_argument("--refresh", action="store_true", help="re-download every DOI, ignoring cached copies")
+ap.add_argument("--no-cache", action="store_true", help="do not use the on-disk Crossref cache")
+ap.add_argument("--full", action="store_true", help="ignore the ORCID sync state (implied by --refresh)")
+ap.add_argument("--orcids-file", type=Path, help="file with one ORCID iD per line")
+ap.add_argument("--shards", action="store_true", help="also write _data/pubs/<year>.json and index.json")
+ap.add_argument("--html", action="store_true", help="also write the list as _includes/publist.html")
+ap.add_argument("--source", choices=("orcid", "openalex"), default="orcid", help="where the works list comes from")
+ap.add_argument("--cross-fill", action="store_true", help="fill empty fields from the other source's output")
+ap.add_argument("--stream", action="store_true", help="parse ORCID works responses incrementally")
+add_arguments(ap)
+args = ap.parse_args()
+if args.source != "orcid" and (args.shards or args.html):
+    # _data/pubs/ and _includes/publist.html are what _pages/publications.md renders
+    ap.error("--shards and --html render the ORCID list the publications page uses; not with --source "
+             + args.source)
+METRICS = Metrics("update_publications_orcid", args.metrics, args.profile)
+
+if args.orcids_file:
+    for line in args.orcids_file.read_text(encoding="utf-8").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            ORCID.append(line)
+ORCID = list(dict.fromkeys(ORCID))
 
 if not ORCID:
     print("ERROR: ORCID env is empty.")
     sys.exit(1)
 
 OUT = Path("_data/pubs_orcid.json")
+OUTPUTS = {"orcid": OUT, "openalex": OUT.parent / "pubs_openalex.json"}
 OUT.parent.mkdir(parents=True, exist_ok=True)
+CACHE = None if args.no_cache else CrossrefCache(OUT.parent / ".cache" / "crossref.sqlite", CACHE_TTL_DAYS)
+SYNC = OUT.parent / ".cache" / "orcid_sync.json"
+JOURNAL = OUT.parent / ".cache" / "orcid_journal.jsonl"
+MEMBERS_DIR = OUT.parent / "pubs_members"
+SHARDS_DIR = OUT.parent / "pubs"
+HTML_OUT = Path("_includes/publist.html")
+HTML_META = OUT.parent / "publist.json"
+GROUP = len(ORCID) > 1
+cache_stats = {"hit": 0, "revalidated": 0, "downloaded": 0, "batched": 0, "batches": 0}
+# trimmed messages fetched by Prefetch; None = DOI unknown to Crossref
+prefetched: Dict[str, Optional[Dict]] = {}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        cache_stats[name] += 1
+
 
 # ---------- HTTP session ----------
 s = requests.Session()
@@ -40,27 +183,47 @@ s.headers.update({
     "User-Agent": UA,
     "Accept": "application/json",
 })
+# one pooled connection per worker, shared by all threads
+for scheme in ("https://", "http://"):
+    s.mount(scheme, HTTPAdapter(pool_connections=4, pool_maxsize=WORKERS))
+
+
+def _record_response(r: requests.Response, *args, stream: bool = False, **kwargs) -> None:
+    # reading r.content here would load a streamed body in full; use its declared length instead
+    nbytes = int(r.headers.get("Content-Length") or 0) if stream else len(r.content)
+    METRICS.request(urlsplit(r.url).netloc, r.elapsed.total_seconds(), nbytes, r.status_code)
+
+
+if METRICS.enabled:
+    s.hooks["response"].append(_record_response)
+
+
+# be polite: each API gets its own adaptive limiter (see ratelimit.py), which replaces the old
+# fixed 0.2 s sleep per DOI and backs off on 429/5xx instead of losing the enrichment
+crossref_limiter = AdaptiveLimiter(RPS, WORKERS)
+orcid_limiter = AdaptiveLimiter(ORCID_RPS, WORKERS)
+openalex_limiter = AdaptiveLimiter(OPENALEX_RPS, 1)   # cursor pages are sequential
+retry_budget = RetryBudget(RETRY_BUDGET)
+
+
+def get(url: str, limiter: AdaptiveLimiter, **kwargs) -> requests.Response:
+    return fetch(s, url, limiter, retry_budget, on_retry=lambda u: METRICS.retry(urlsplit(u).netloc), **kwargs)
+
 
 # ---------- Helpers ----------
 
-def canon_doi(doi: str) -> str:
-    if not doi:
-        return ""
-    doi = doi.strip()
-    for pref in ("https://doi.org/", "http://doi.org/", "doi:"):
-        if doi.lower().startswith(pref):
-            doi = doi[len(pref):]
-            break
-    return doi.strip().strip('/')
+ORCID_HEADERS = {"Accept": "application/vnd.orcid+json"}
+if UA_EMAIL:
+    ORCID_HEADERS["User-Agent"] = UA
+
+# (title, doi, year, summary unchanged since the last sync, put-code)
+Todo = Tuple[str, str, int, bool, str]
 
 
 def orcid_works(orcid: str) -> List[Dict]:
     """Fetch works summary from ORCID public API."""
-    url = f"https://pub.orcid.org/v3.0/{orcid}/works"
-    hdrs = {"Accept": "application/vnd.orcid+json"}
-    if UA_EMAIL:
-        hdrs["User-Agent"] = UA
-    r = s.get(url, headers=hdrs, timeout=60)
+    url = f"{ORCID_API}/{orcid}/works"
+    r = get(url, orcid_limiter, headers=ORCID_HEADERS)
     r.raise_for_status()
     data = r.json()
     groups = (data.get("group") or [])
@@ -72,6 +235,16 @@ def orcid_works(orcid: str) -> List[Dict]:
     return items
 
 
+def orcid_works_stream(orcid: str) -> Iterator[Dict]:
+    """orcid_works(), but yielding each summary as soon as its group has been downloaded."""
+    url = f"{ORCID_API}/{orcid}/works"
+    r = get(url, orcid_limiter, headers=ORCID_HEADERS, stream=True)
+    with r:
+        r.raise_for_status()
+        for g in iter_array(r.iter_content(chunk_size=65536), "group"):
+            yield from (g or {}).get("work-summary") or []
+
+
 def extract_from_orcid_summary(w: Dict) -> Tuple[str, str, int]:
     """Return (title, doi, year)."""
     title = (((w.get("title") or {}).get("title") or {}).get("value") or "").strip()
@@ -93,13 +266,177 @@ def extract_from_orcid_summary(w: Dict) -> Tuple[str, str, int]:
     return title, doi, yr
 
 
+def orcid_work_details(orcid: str, putcodes: List[str]) -> Dict[str, Dict]:
+    """{put-code: record} for up to ORCID_BULK works, from one bulk work request."""
+    url = f"{ORCID_API}/{orcid}/works/{','.join(putcodes)}"
+    r = get(url, orcid_limiter, headers=ORCID_HEADERS)
+    r.raise_for_status()
+    out = {}
+    for item in (r.json() or {}).get("bulk") or []:
+        w = item.get("work")   # a put-code ORCID cannot return comes back as {"error": {...}}
+        if w and w.get("put-code") is not None:
+            out[str(w["put-code"])] = detail_record(w)
+    return out
+
+
+def detail_record(w: Dict) -> Dict:
+    """Output record from an ORCID work detail (a work without DOI)."""
+    title = (((w.get("title") or {}).get("title") or {}).get("value") or "").strip() or None
+    venue = ((w.get("journal-title") or {}).get("value") or "").strip() or None
+    pd = w.get("publication-date") or {}
+    parts = [((pd.get(k) or {}).get("value") or "") for k in ("year", "month", "day")]
+    pub_date = None
+    if parts[0].isdigit():
+        y, m, d = (int(p) if p.isdigit() else 1 for p in parts)
+        pub_date = f"{y:04d}-{m:02d}-{d:02d}"
+    authors = []
+    for c in ((w.get("contributors") or {}).get("contributor") or []):
+        role = ((c.get("contributor-attributes") or {}).get("contributor-role") or "author").lower()
+        name = ((c.get("credit-name") or {}).get("value") or "").strip()
+        if name and role == "author":
+            authors.append(name)
+    return {
+        "title": title,
+        "venue": venue,
+        "publication_date": pub_date,
+        "authors": ", ".join(authors) or None,
+        "doi": "",
+    }
+
+
+def fetch_details(requests_todo: List[Tuple[str, List[str]]], pool: ThreadPoolExecutor) -> Dict[str, Dict[str, Dict]]:
+    """{orcid: {put-code: record}} for (orcid, put-codes) chunks, fetched concurrently."""
+    def _fetch(job: Tuple[str, List[str]]) -> Dict[str, Dict]:
+        orcid, putcodes = job
+        try:
+            res = orcid_work_details(orcid, putcodes)
+        except requests.RequestException as e:
+            print(f"WARN: ORCID work details for {len(putcodes)} works of {orcid} failed: {e}")
+            return {}
+        if journal:
+            for pc, rec in res.items():
+                journal.add("detail", f"{orcid}/{pc}", rec)
+        return res
+
+    details: Dict[str, Dict[str, Dict]] = {}
+    for (orcid, _), res in zip(requests_todo, pool.map(_fetch, requests_todo)):
+        details.setdefault(orcid, {}).update(res)
+    return details
+
+
 def crossref_by_doi(doi: str) -> Dict:
-    url = f"https://api.crossref.org/works/{doi}"
-    r = s.get(url, timeout=60)
+    key = canon_doi(doi).lower()
+    if key in prefetched:
+        return crossref_record(doi, prefetched[key])
+    hit = CACHE.get(key) if CACHE else None
+    if hit and args.refresh:
+        hit = None
+    if hit and hit.fresh:
+        _count("hit")
+        return crossref_record(doi, hit.message)
+    url = f"{CROSSREF_API}/works/{doi}"
+    hdrs = {}
+    if hit and hit.etag:
+        hdrs["If-None-Match"] = hit.etag
+    if hit and hit.last_modified:
+        hdrs["If-Modified-Since"] = hit.last_modified
+    r = get(url, crossref_limiter, headers=hdrs)
+    if r.status_code == 304 and hit:
+        _count("revalidated")
+        CACHE.touch(key)
+        return crossref_record(doi, hit.message)
     if r.status_code == 404:
+        if CACHE:
+            CACHE.put(key, None)
         return {}
     r.raise_for_status()
-    m = (r.json() or {}).get("message") or {}
+    _count("downloaded")
+    m = trim_message((r.json() or {}).get("message") or {})
+    if CACHE:
+        CACHE.put(key, m, r.headers.get("ETag", ""), r.headers.get("Last-Modified", ""))
+    return crossref_record(doi, m)
+
+
+CROSSREF_SELECT = "DOI,title,author,container-title,published-print,published-online,published,created"
+
+
+def crossref_batch(keys: List[str]) -> Dict[str, Optional[Dict]]:
+    """Resolve several DOIs with one /works?filter=doi:a,doi:b&select=... request."""
+    params = {
+        "filter": ",".join(f"doi:{k}" for k in keys),
+        "select": CROSSREF_SELECT,
+        "rows": len(keys),
+    }
+    r = get(f"{CROSSREF_API}/works", crossref_limiter, params=params)
+    r.raise_for_status()
+    items = ((r.json() or {}).get("message") or {}).get("items") or []
+    found = {(it.get("DOI") or "").lower(): trim_message(it) for it in items}
+    # a DOI missing from the result is what a per-DOI GET would have 404ed on
+    return {k: found.get(k) for k in keys}
+
+
+class Prefetch:
+    """Fills `prefetched` for every DOI the cache cannot answer, BATCH DOIs per request.
+
+    DOIs are added while the ORCID works are still being read (from any thread); every full
+    batch is submitted to the pool right away, so Crossref lookups overlap the ORCID download.
+    Stale cache entries that carry an ETag/Last-Modified are left to crossref_by_doi(),
+    which revalidates them individually; batch responses have no validators.
+    """
+
+    def __init__(self, pool: ThreadPoolExecutor):
+        self.pool = pool
+        self.seen = set()
+        self.keys: List[str] = []
+        self.futures = []
+        self._lock = threading.Lock()
+
+    def add(self, doi: str) -> None:
+        doi = canon_doi(doi).lower()
+        if "," in doi:   # would split the filter; per-DOI GET handles it
+            return
+        with self._lock:
+            if doi in self.seen:
+                return
+            self.seen.add(doi)
+        hit = CACHE.get(doi) if CACHE and not args.refresh else None
+        if hit and (hit.fresh or hit.etag or hit.last_modified):
+            return
+        with self._lock:
+            self.keys.append(doi)
+            if len(self.keys) < BATCH:
+                return
+            chunk, self.keys = self.keys, []
+        self.futures.append(self.pool.submit(self._fetch, chunk))
+
+    @staticmethod
+    def _fetch(chunk: List[str]) -> Dict[str, Optional[Dict]]:
+        try:
+            return crossref_batch(chunk)
+        except requests.RequestException as e:
+            print(f"WARN: Crossref batch of {len(chunk)} failed, falling back to per-DOI: {e}")
+            return {}
+
+    def finish(self) -> None:
+        """Submit the last partial batch and wait for all of them."""
+        if self.keys:
+            self.futures.append(self.pool.submit(self._fetch, self.keys))
+            self.keys = []
+        for future in self.futures:
+            res = future.result()
+            if res:
+                _count("batches")
+            for k, m in res.items():
+                prefetched[k] = m
+                if CACHE:
+                    CACHE.put(k, m)
+        cache_stats["batched"] = len(prefetched)
+
+
+def crossref_record(doi: str, m: Dict) -> Dict:
+    """Map a (trimmed) Crossref message to an output record; {} for a cached 404."""
+    if m is None:
+        return {}
     # Build output
     title = (" ".join((m.get("title") or [""]))).strip() or None
     container = (" ".join((m.get("container-title") or [""]))).strip() or None
@@ -133,47 +470,422 @@ def crossref_by_doi(doi: str) -> Dict:
         "doi": canon_doi(doi),
     }
 
-# ---------- Main ----------
-this_year = datetime.now(timezone.utc).year
-cutoff = this_year - YEARS + 1
-
-works = orcid_works(ORCID)
-records: List[Dict] = []
-seen = set()
-
-for w in works:
-    title0, doi0, yr0 = extract_from_orcid_summary(w)
-    if yr0 and yr0 < cutoff:
-        continue
-    if not title0 and not doi0:
-        continue
-    key = doi0 or title0
-    if key in seen:
-        continue
-    seen.add(key)
 
+def enrich(item: Tuple[str, str, int]) -> Dict:
+    """Crossref record for one ORCID work, or a title + year fallback."""
+    title0, doi0, yr0 = item
     rec = None
     if doi0:
         try:
             rec = crossref_by_doi(doi0)
-            # be polite to Crossref
-            time.sleep(0.2)
         except requests.RequestException as e:
             print(f"WARN: Crossref failed for {doi0}: {e}")
             rec = None
     if not rec:
-        # fall back to ORCID title + year only
+        # fall back to ORCID title + year only; the flag is never saved (see public_record)
         rec = {
             "title": title0 or None,
             "venue": None,
             "publication_date": f"{yr0}-01-01" if yr0 else None,
             "authors": None,
             "doi": canon_doi(doi0),
+            FALLBACK: True,
         }
-    records.append(rec)
+    return rec
+
+
+def member_out(orcid: str) -> Path:
+    return MEMBERS_DIR / f"{orcid}.json" if GROUP else OUT
+
+
+def load_sync_state(orcids: List[str]) -> Tuple[Dict, Dict, Dict, set]:
+    """Previous {orcid: {put-code: [last-modified, title, doi, year]}}, {doi: record} and
+    {orcid: {put-code: record}} (DOI-less works enriched from ORCID) maps, and the DOIs whose
+    records were title-only fallbacks."""
+    if args.full or args.refresh or not SYNC.exists():
+        return {}, {}, {}, set()
+    try:
+        state = json.loads(SYNC.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}, {}, {}, set()
+    profiles = state.get("profiles") or {}
+    # title-only fallbacks of the last run; --cross-fill may have given them authors since
+    fallbacks = set(state.get("fallbacks") or [])
+    prev_works, by_doi = {}, {}
+    for orcid in orcids:
+        path = member_out(orcid)
+        if orcid not in profiles or not path.exists():
+            continue
+        try:
+            old_records = json.loads(path.read_text(encoding="utf-8"))
+        except ValueError:
+            continue
+        prev_works[orcid] = profiles[orcid]
+        # only fully enriched records are reused; title-only fallbacks get another try
+        by_doi.update((r["doi"], r) for r in old_records
+                      if r.get("doi") and r["doi"] not in fallbacks and r.get("authors") is not None)
+    details = {orcid: d for orcid, d in (state.get("details") or {}).items() if orcid in prev_works}
+    return prev_works, by_doi, details, fallbacks
+
+
+def select_works(works: Iterable[Dict], prev: Dict,
+                 prefetch: Optional[Prefetch] = None) -> Tuple[List[Todo], Dict[str, List], int]:
+    """Apply the cutoff and dedup to one profile, as the works come in; unchanged summaries skip
+    extraction. DOIs that need Crossref go to `prefetch` immediately. Also returns the number of works."""
+    sync_works: Dict[str, List] = {}
+    todo: List[Todo] = []
+    seen = set()
+    n_works = n_unchanged = 0
+    for w in works:
+        n_works += 1
+        pc = str(w.get("put-code") or "")
+        lmd = (w.get("last-modified-date") or {}).get("value")
+        old = prev.get(pc) if pc else None
+        unchanged = bool(old) and lmd is not None and old[0] == lmd
+        if unchanged:
+            title0, doi0, yr0 = old[1:]
+            n_unchanged += 1
+        else:
+            title0, doi0, yr0 = extract_from_orcid_summary(w)
+        if pc:
+            sync_works[pc] = [lmd, title0, doi0, yr0]
+        if yr0 and yr0 < cutoff:
+            METRICS.count("skipped_cutoff")
+            continue
+        if not title0 and not doi0:
+            METRICS.count("skipped_untitled")
+            continue
+        key = doi0 or title0
+        if key in seen:
+            METRICS.count("skipped_seen")
+            continue
+        seen.add(key)
+        todo.append((title0, doi0, yr0, unchanged, pc))
+        if prefetch and doi0 and not (unchanged and doi0 in prev_records) \
+                and not (journal and journal.get("doi", doi0)):
+            prefetch.add(doi0)
+    n_deleted = len(set(prev) - set(sync_works))
+    print(f"ORCID sync: {n_unchanged} unchanged, {n_works - n_unchanged} new/changed, {n_deleted} deleted")
+    return todo, sync_works, n_works
+
+
+def sync_enrich(item: Todo) -> Dict:
+    title0, doi0, yr0, unchanged, _ = item
+    if unchanged and doi0 in prev_records:
+        return prev_records[doi0]
+    done = journal.get("doi", doi0) if journal and doi0 else None
+    if done:
+        return done
+    rec = enrich((title0, doi0, yr0))
+    # only fully enriched records are checkpointed; title-only fallbacks get another try
+    if journal and doi0 and not rec.get(FALLBACK):
+        journal.add("doi", doi0, rec)
+    return rec
+
+
+def with_details(item: Todo, detail: Optional[Dict]) -> Dict:
+    """Title + year record of a DOI-less work, overlaid with what its ORCID detail provides."""
+    rec = sync_enrich(item)
+    if detail:
+        rec = {**rec, **{k: v for k, v in detail.items() if v}}
+    return rec
+
+
+def public_record(rec: Dict) -> Dict:
+    """`rec` without the run-internal flags (FALLBACK)."""
+    return {k: v for k, v in rec.items() if not k.startswith("_")}
+
+
+def sort_and_save(records: List[Dict], path: Path) -> None:
+    # sort desc by date
+    records.sort(key=lambda x: x.get("publication_date") or "", reverse=True)
+    write_atomic(path, json.dumps([public_record(r) for r in records], ensure_ascii=False, indent=2))
+    print(f"Saved {len(records)} records to {path}")
+
+
+def display_record(rec: Dict) -> Dict:
+    """Record plus the fields the publications page would otherwise compute in Liquid."""
+    authors = " ".join((rec.get("authors") or "").split())
+    return {**public_record(rec), "year": (rec.get("publication_date") or "")[:4] or None, "authors_display": authors or None}
+
+
+def save_shards(records: List[Dict], directory: Path) -> None:
+    """One JSON file per publication year plus index.json; unchanged shards are not rewritten."""
+    shards: Dict[str, List[Dict]] = {}
+    for rec in records:   # already sorted newest first
+        year = (rec.get("publication_date") or "")[:4]
+        shards.setdefault(year if year.isdigit() else "undated", []).append(display_record(rec))
+    directory.mkdir(parents=True, exist_ok=True)
+    written = 0
+    for name, recs in shards.items():
+        path = directory / f"{name}.json"
+        text = json.dumps(recs, ensure_ascii=False, indent=2)
+        if not path.exists() or path.read_text(encoding="utf-8") != text:
+            write_atomic(path, text)
+            written += 1
+    for path in shard_files(directory):
+        if path.stem not in shards and path.stem != "index":
+            path.unlink()
+            written += 1
+    order = sorted(shards, key=lambda n: n if n.isdigit() else "", reverse=True)
+    index = {
+        "total": len(records),
+        "years": [{"year": int(n) if n.isdigit() else 0, "shard": n, "count": len(shards[n])} for n in order],
+    }
+    write_atomic(directory / "index.json", json.dumps(index, ensure_ascii=False, indent=2))
+    print(f"Saved {len(shards)} year shards to {directory} ({written} changed)")
+    METRICS.count("shards_written", written)
+
+
+def shard_files(directory: Path) -> List[Path]:
+    return [p for p in directory.glob("*.json") if p.stem.isdigit() or p.stem in ("undated", "index")]
+
+
+def remove_stale(paths: List[Path], flag: str) -> None:
+    """Delete outputs of an earlier run with `flag`, so the page does not keep rendering them."""
+    removed = [p for p in paths if p.exists()]
+    for path in removed:
+        path.unlink()
+    if removed:
+        print(f"Removed {len(removed)} file(s) only written with {flag}: {', '.join(map(str, removed[:3]))}"
+              + (", ..." if len(removed) > 3 else ""))
+
+
+def _text(value: str) -> str:
+    # escaped, with braces as entities so Liquid leaves titles like "{X}" alone
+    return html.escape(value).replace("{", "&#123;").replace("}", "&#125;")
+
+
+def html_item(rec: Dict) -> str:
+    """One <li> of the publications page, as _pages/publications.md renders it."""
+    authors = _text(" ".join((rec.get("authors") or "").split())) or "{{ site.author.name }}"
+    year = (rec.get("publication_date") or "")[:4]
+    line = authors + (f" ({_text(year)})" if year else "") + "."
+    parts = [line, _text(rec.get("title") or "") + "."]
+    if rec.get("venue"):
+        parts.append(f"<em>{_text(rec['venue'])}</em>.")
+    if rec.get("doi"):
+        doi = _text(rec["doi"])
+        parts.append(f'<a href="https://doi.org/{doi}">doi:{doi}</a>')
+    return "  <li>\n    " + "\n    ".join(parts) + "\n  </li>\n"
+
+
+def save_html(records: List[Dict], path: Path, meta_path: Path) -> None:
+    """Write the HTML fragment and its hash, unless the hash matches the last run's."""
+    body = "".join(html_item(r) for r in records)
+    digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+    try:
+        old = json.loads(meta_path.read_text(encoding="utf-8")).get("sha256")
+    except (OSError, ValueError):
+        old = None
+    if old == digest and path.exists():
+        print(f"HTML fragment {path} unchanged")
+        return
+    write_atomic(path, f"<!-- generated by scripts/update_publications_orcid.py --html; sha256 {digest} -->\n" + body)
+    meta = {"include": path.name, "sha256": digest, "count": len(records)}
+    write_atomic(meta_path, json.dumps(meta, indent=2))
+    print(f"Saved HTML fragment with {len(records)} items to {path}")
+
+
+# ---------- Main ----------
+this_year = datetime.now(timezone.utc).year
+cutoff = this_year - YEARS + 1
+prev_records: Dict[str, Dict] = {}
+journal: Optional[Journal] = None
+fill_source: Optional[List[Dict]] = None
+n_filled = 0
+if args.cross_fill:
+    other = OUTPUTS["orcid" if args.source == "openalex" else "openalex"]
+    if other.exists():
+        fill_source = json.loads(other.read_text(encoding="utf-8"))
+    else:
+        print(f"WARN: --cross-fill: {other} does not exist")
+
+
+def apply_cross_fill(records: List[Dict]) -> None:
+    """--cross-fill: fill empty fields of `records` in place from the other source's output."""
+    global n_filled
+    if fill_source is not None:
+        n_filled += cross_fill(records, fill_source)
+
+
+def run_orcid() -> List[Dict]:
+    """ORCID works enriched from Crossref and ORCID work details. Also writes the member files
+    and the sync state; returns the records for the main output."""
+    global prev_records, journal
+    prev_works, prev_records, prev_details, prev_fallbacks = load_sync_state(ORCID)
+    # --refresh is part of the header: a forced refresh must not resume records a normal run took
+    # from the Crossref cache (an interrupted --refresh run is resumed by the next --refresh)
+    journal = Journal(JOURNAL, {"orcids": ORCID, "years": YEARS, "refresh": args.refresh})
+    if journal.resumed:
+        print(f"Journal: resuming an interrupted run, {len(journal.entries.get('doi') or {})} records and "
+              f"{len(journal.entries.get('detail') or {})} ORCID details already done")
+    todos: Dict[str, List[Todo]] = {}
+    sync_profiles: Dict[str, Dict[str, List]] = {}
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        prefetch = Prefetch(pool) if BATCH else None
+
+        def _profile(orcid: str) -> Optional[Tuple[List[Todo], Dict[str, List], int]]:
+            try:
+                works = orcid_works_stream(orcid) if args.stream else orcid_works(orcid)
+                return select_works(works, prev_works.get(orcid) or {}, prefetch)
+            except (requests.RequestException, ValueError) as e:
+                print(f"WARN: ORCID works of {orcid} failed: {e}")
+                return None
+
+        failed: List[str] = []
+        with METRICS.phase("orcid"):
+            for orcid, profile in zip(ORCID, pool.map(_profile, ORCID)):
+                if profile is None:
+                    failed.append(orcid)
+                    continue
+                todos[orcid], sync_profiles[orcid], n_works = profile
+                if GROUP:
+                    print(f"{orcid}: {n_works} works")
+                METRICS.count("orcid_works", n_works)
+        if not todos:
+            print("ERROR: no ORCID profile could be fetched; nothing written")
+            sys.exit(1)
+        METRICS.count("orcid_failed_profiles", len(failed))
+
+        # a co-authored DOI is enriched once, for whichever member lists it first
+        unique: Dict[str, Todo] = {}
+        for todo in todos.values():
+            for t in todo:
+                if t[1]:
+                    unique.setdefault(t[1], t)
+        if prefetch:
+            with METRICS.phase("crossref_batch"):
+                prefetch.finish()
+        with METRICS.phase("crossref_enrich"):
+            enriched = dict(zip(unique, pool.map(sync_enrich, unique.values())))
+
+        # DOI-less works: unchanged ones keep last run's ORCID details, the rest are fetched in bulk
+        details: Dict[str, Dict[str, Dict]] = {}
+        detail_jobs: List[Tuple[str, List[str]]] = []
+        for orcid, todo in todos.items():
+            old = prev_details.get(orcid) or {}
+            details[orcid] = {t[4]: old[t[4]] for t in todo if not t[1] and t[3] and t[4] in old}
+            for t in todo:
+                done = journal.get("detail", f"{orcid}/{t[4]}") if not t[1] and t[4] not in details[orcid] else None
+                if done:
+                    details[orcid][t[4]] = done
+            missing = [t[4] for t in todo if not t[1] and t[4] and t[4] not in details[orcid]]
+            detail_jobs += [(orcid, missing[i:i + ORCID_BULK]) for i in range(0, len(missing), ORCID_BULK)]
+        with METRICS.phase("orcid_details"):
+            for orcid, fetched in fetch_details(detail_jobs, pool).items():
+                details[orcid].update(fetched)
+        n_details = sum(len(d) for d in details.values())
+        print(f"ORCID details: {n_details} works without DOI, {len(detail_jobs)} bulk requests")
+        METRICS.count("orcid_detail_requests", len(detail_jobs))
+
+    print("Crossref: {hit} cached, {revalidated} revalidated, {downloaded} downloaded, "
+          "{batched} in {batches} batch requests".format(**cache_stats))
+    print(f"Rate control: Crossref ended at {crossref_limiter.rate:g} req/s, "
+          f"{crossref_limiter.throttled} throttled; ORCID {orcid_limiter.throttled} throttled")
+    for name, n in cache_stats.items():
+        METRICS.count(f"crossref_{name}", n)
+    METRICS.count("crossref_rate_limit_wait_s", crossref_limiter.waited)
+    METRICS.count("crossref_throttled", crossref_limiter.throttled)
+    METRICS.count("orcid_throttled", orcid_limiter.throttled)
+
+    group_records: List[Dict] = []
+    records: List[Dict] = []
+    group_seen = set()
+    with METRICS.phase("write"):
+        for orcid, todo in todos.items():
+            # ORCID order is kept before the (stable) date sort, as in the serial path
+            records = [enriched[t[1]] if t[1] else with_details(t, details[orcid].get(t[4])) for t in todo]
+            for rec in records:
+                key = (rec.get("doi") or "").lower() or (rec.get("title") or "").lower()
+                if key not in group_seen:
+                    group_seen.add(key)
+                    group_records.append(rec)
+                else:
+                    METRICS.count("skipped_group_duplicate")
+            apply_cross_fill(records)
+            if GROUP:
+                sort_and_save(records, member_out(orcid))
+
+        # a member whose profile failed keeps its file and sync state; its last records stay in the group list
+        kept_fallbacks = set()
+        for orcid in failed:
+            path = member_out(orcid)
+            try:
+                old_records = json.loads(path.read_text(encoding="utf-8")) if GROUP and path.exists() else []
+            except ValueError:
+                old_records = []
+            print(f"{orcid}: keeping its previous {len(old_records)} records")
+            for rec in old_records:
+                key = (rec.get("doi") or "").lower() or (rec.get("title") or "").lower()
+                if key not in group_seen:
+                    group_seen.add(key)
+                    group_records.append(rec)
+                if rec.get("doi") in prev_fallbacks:
+                    kept_fallbacks.add(rec["doi"])
+            if orcid in prev_works:
+                sync_profiles[orcid] = prev_works[orcid]
+                details[orcid] = prev_details.get(orcid) or {}
+
+        fallbacks = sorted(kept_fallbacks | {r["doi"] for todo in todos.values() for t in todo if t[1]
+                                             for r in [enriched[t[1]]] if r.get(FALLBACK) and r.get("doi")})
+        write_atomic(SYNC, json.dumps({"profiles": sync_profiles, "details": details, "fallbacks": fallbacks},
+                                      ensure_ascii=False))
+    return group_records if GROUP else records
+
+
+def run_openalex() -> List[Dict]:
+    """Every work of the ORCID iDs from OpenAlex, cursor-paged, mapped to output records."""
+    pages = 0
+
+    def _get(url: str, **kwargs) -> requests.Response:
+        nonlocal pages
+        pages += 1
+        return get(url, openalex_limiter, **kwargs)
+
+    records: List[Dict] = []
+    seen = set()
+    with METRICS.phase("openalex"):
+        for w in openalex_works(_get, OPENALEX_API, ORCID, cutoff, UA_EMAIL):
+            METRICS.count("openalex_works")
+            rec = openalex_record(w)
+            key = rec["doi"].lower() or (rec["title"] or "").lower()
+            if not key:
+                METRICS.count("skipped_untitled")
+                continue
+            if key in seen:
+                METRICS.count("skipped_seen")
+                continue
+            seen.add(key)
+            records.append(rec)
+    print(f"OpenAlex: {len(records)} works in {pages} requests, {openalex_limiter.throttled} throttled")
+    METRICS.count("openalex_requests", pages)
+    return records
+
+
+out_records = run_openalex() if args.source == "openalex" else run_orcid()
+if CACHE:
+    CACHE.close()
+apply_cross_fill(out_records)   # no-op for records run_orcid() already filled
+if fill_source is not None:
+    print(f"Cross-fill: {n_filled} empty fields filled from {other}")
+    METRICS.count("cross_filled", n_filled)
 
-# sort desc by date
-records.sort(key=lambda x: x.get("publication_date") or "", reverse=True)
+with METRICS.phase("write"):
+    sort_and_save(out_records, OUTPUTS[args.source])
+    if args.shards:
+        save_shards(out_records, SHARDS_DIR)
+    elif args.source == "orcid":
+        remove_stale(shard_files(SHARDS_DIR), "--shards")
+        if SHARDS_DIR.is_dir() and not any(SHARDS_DIR.iterdir()):
+            SHARDS_DIR.rmdir()
+    if args.html:
+        save_html(out_records, HTML_OUT, HTML_META)
+    elif args.source == "orcid":
+        remove_stale([HTML_META, HTML_OUT], "--html")
 
-OUT.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
-print(f"Saved {len(records)} records to {OUT}")
+if journal:
+    journal.finish()
+METRICS.count("records", len(out_records))
+METRICS.finish()
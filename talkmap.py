@@ -5,43 +5,64 @@
 # (c) 2016-2017 R. Stuart Geiger, released under the MIT license
 #
 # Run this from the _talks/ directory, which contains .md files of all your talks. 
-# This scrapes the location YAML field from each .md file, geolocates it with
-# geopy/Nominatim, and uses the getorg library to output data, HTML,
-# and Javascript for a standalone cluster map.
+# This reads the location YAML field of each .md file from the front-matter index
+# (scripts/frontmatter.py, cached in ../_data/.cache/frontmatter/), geolocates it with
+# geopy/Nominatim, and writes a standalone cluster map to ../talkmap/.
 #
-# Requires: glob, getorg, geopy
-
-import glob
-import getorg
-from geopy import Nominatim
-
-g = glob.glob("*.md")
-
-
-geocoder = Nominatim()
-location_dict = {}
-location = ""
-permalink = ""
-title = ""
+# The marker clusters are precomputed for every zoom level (scripts/mapclusters.py) and
+# written as static tiles in ../talkmap/clusters/; map.html loads only the tiles of the
+# current view and zoom, so thousands of talks do not slow the page down. The tiles are
+# loaded as <script>s, so map.html also works opened from disk, without a web server. With
+# --getorg, the getorg library writes its client-side Leaflet.markercluster map instead.
+#
+# Geocoding results are cached in ../_data/.cache/geocode.json (see scripts/geocache.py):
+# each distinct location is looked up once, misses are sent to Nominatim at most once
+# per second, and locations Nominatim could not find are remembered for 30 days.
+#
+#   python ../talkmap.py                       # geocode new locations with Nominatim
+#   python ../talkmap.py --refresh             # look every location up again
+#   python ../talkmap.py --offline table.json  # no network: {"location": [lat, lon], ...}
+#   python ../talkmap.py --getorg              # the previous getorg map
+#
+# Requires: geopy (not with --offline); getorg for --getorg
 
+import argparse
+import os
+import sys
 
-for file in g:
-    with open(file, 'r') as f:
-        lines = f.read()
-        if lines.find('location: "') > 1:
-            loc_start = lines.find('location: "') + 11
-            lines_trim = lines[loc_start:]
-            loc_end = lines_trim.find('"')
-            location = lines_trim[:loc_end]
-                            
-           
-        location_dict[location] = geocoder.geocode(location)
-        print(location, "\n", location_dict[location])
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from frontmatter import FrontMatterIndex
+from geocache import GeocodeCache, NominatimBackend, OfflineBackend
+from mapclusters import write_map
 
+parser = argparse.ArgumentParser(description="Build the talk map from the talks in the current directory.")
+parser.add_argument("--offline", metavar="TABLE", help="geocode from a JSON {location: [lat, lon]} table instead of Nominatim")
+parser.add_argument("--refresh", action="store_true", help="ignore cached geocoding results")
+parser.add_argument("--cache", default="../_data/.cache/geocode.json", help="geocoding cache file")
+parser.add_argument("--getorg", action="store_true", help="write getorg's client-side cluster map instead")
+args = parser.parse_args()
 
-m = getorg.orgmap.create_map_obj()
-getorg.orgmap.output_html_cluster_map(location_dict, folder_name="../talkmap", hashed_usernames=False)
+index = FrontMatterIndex(".")
+# talks without a location are left off the map
+locations = list(index.field("location").values())
 
 
+backend = OfflineBackend(args.offline) if args.offline else NominatimBackend()
+cache = GeocodeCache(args.cache)
+resolved = cache.resolve(locations, backend, min_interval=0 if args.offline else 1.0, refresh=args.refresh)
+cache.save()
+location_dict = {location: place for location, place in resolved.items() if place is not None}
+for location, place in resolved.items():
+    print(location, "\n", place)
+print("geocoding: {hit} cached, {miss} looked up, {failed} failed".format(**cache.stats))
 
 
+if args.getorg:
+    import getorg
+    m = getorg.orgmap.create_map_obj()
+    getorg.orgmap.output_html_cluster_map(location_dict, folder_name="../talkmap", hashed_usernames=False)
+else:
+    map_index = write_map({location: (place.latitude, place.longitude) for location, place in location_dict.items()},
+                          "../talkmap")
+    print("map: {} locations, clusters for zoom 0-{} in {} tiles".format(
+        map_index["points"], map_index["max_zoom"], sum(len(t) for t in map_index["tiles"].values())))